@@ -1,13 +1,16 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request
 import time
 import threading
 import os
+import json
 from dotenv import load_dotenv
 from openai import OpenAI
 
 # Import custom modules
 from dream_system import DreamSystem
 from memory_system import MemorySystem
+from emotional_system import EmotionalSystem
+from llm_gateway import LLMGateway
 
 app = Flask(__name__)
 
@@ -19,7 +22,8 @@ api_key = os.getenv("OPENAI_API_KEY")
 def create_client(api_key):
     try:
         # Initialize client without proxy settings
-        client = OpenAI(api_key=api_key)
+        # Retries are handled by the LLM gateway, not the client
+        client = OpenAI(api_key=api_key, max_retries=0)
         # Quick validation of client
         client.models.list()
         return client
@@ -30,9 +34,43 @@ def create_client(api_key):
 
 client = create_client(api_key)
 
+# Shared gateway so every system draws from the same API quota
+llm_gateway = LLMGateway(client)
+
 # Initialize the systems
 memory_system = MemorySystem()
-dream_system = DreamSystem(client, memory_system)
+dream_system = DreamSystem(client, memory_system, llm_gateway=llm_gateway,
+                           checkpoint_path="dream_checkpoint.json", archive_path="dream_archive.db")
+# Event-driven, so the emotion state uses no CPU between chats, and background thoughts
+# (LLM calls) only run for a while after each message rather than for the life of the server
+emotional_system = EmotionalSystem(client, memory_system, llm_gateway=llm_gateway, event_driven=True,
+                                   thought_window=300)
+
+# Track requests in flight so auto-dreaming backs off while the server is busy
+active_requests = 0
+active_requests_lock = threading.Lock()
+request_load_capacity = 8  # Requests in flight that count as full load
+
+
+def get_request_load():
+    return min(1.0, active_requests / request_load_capacity)
+
+
+dream_system.load_probe = get_request_load
+
+
+@app.before_request
+def track_request_start():
+    global active_requests
+    with active_requests_lock:
+        active_requests += 1
+
+
+@app.teardown_request
+def track_request_end(error=None):
+    global active_requests
+    with active_requests_lock:
+        active_requests -= 1
 
 
 # ===========================================================================================
@@ -44,15 +82,28 @@ def index():
     return render_template('index.html')
 
 
+def json_response(data):
+    """Serve already-serialized JSON bytes, such as a cached snapshot"""
+    return Response(data, mimetype='application/json')
+
+
 @app.route('/api/dream/state')
 def get_dream_state():
-    return jsonify(dream_system.get_state())
+    return json_response(dream_system.get_state_json())
 
 
 @app.route('/api/dreams/trigger', methods=['POST'])
 def trigger_dream():
-    """Manually trigger a dream cycle"""
-    result = dream_system.trigger_dream_cycle()
+    """Manually trigger a dream cycle
+
+    JSON body: pacing (optional pacing override) and resume (default true) - false discards
+    the checkpoint of an interrupted cycle and starts a new one
+    """
+    data = request.get_json(silent=True) or {}
+    resume = data.get('resume', True)
+    if not isinstance(resume, bool):
+        return jsonify({"success": False, "message": "resume must be true or false"}), 400
+    result = dream_system.trigger_dream_cycle(pacing_mode=data.get('pacing'), resume=resume)
 
     return jsonify({
         "success": True,
@@ -61,20 +112,143 @@ def trigger_dream():
     })
 
 
+@app.route('/api/dreams/cancel', methods=['POST'])
+def cancel_dream():
+    """Cancel the dream cycle in progress"""
+    cancelled = dream_system.cancel_dream_cycle()
+
+    return jsonify({
+        "success": cancelled,
+        "message": "Dream cycle cancelled" if cancelled else "No dream cycle in progress",
+        "dream_state": dream_system.get_state()
+    })
+
+
+@app.route('/api/dreams/auto', methods=['POST'])
+def set_auto_dreaming():
+    """Turn automatic dreaming on or off - body: {"enabled": true/false}"""
+    data = request.get_json(silent=True)
+    enabled = data.get('enabled') if isinstance(data, dict) else None
+    if not isinstance(enabled, bool):
+        return jsonify({"success": False, "message": "enabled must be true or false"}), 400
+
+    dream_system.set_auto_dreaming(enabled)
+    return jsonify({
+        "success": True,
+        "message": f"Auto-dreaming {'enabled' if enabled else 'disabled'}",
+        "dream_state": dream_system.get_state()
+    })
+
+
 @app.route('/api/memories')
 def get_memories():
     """Get recent memories for display"""
-    return jsonify({
-        "regular": memory_system.get_recent_memories(max_count=20),
-        "consolidated": memory_system.get_consolidated_memories(max_count=10),
-        "insights": memory_system.get_insights(max_count=10)
-    })
+    return json_response(memory_system.get_snapshot_json())
 
 
 @app.route('/api/dreams')
 def get_dreams():
-    """Get recent dream records"""
-    return jsonify(dream_system.get_recent_dreams())
+    """Get archived dream records, newest first
+
+    Query parameters: limit, cursor (next_cursor of the previous page), since and until
+    (Unix times), early_termination (true/false) and view (summary or full). The default
+    first page of summaries is served from cache.
+    """
+    if not request.args:
+        return json_response(dream_system.get_recent_dreams_json())
+
+    early_termination = request.args.get('early_termination')
+    return jsonify(dream_system.get_recent_dreams(
+        limit=max(1, min(request.args.get('limit', 10, type=int), 100)),
+        cursor=request.args.get('cursor', type=int),
+        since=request.args.get('since', type=float),
+        until=request.args.get('until', type=float),
+        early_termination=None if early_termination is None else early_termination.lower() == 'true',
+        summary=request.args.get('view', 'summary') != 'full'
+    ))
+
+
+@app.route('/api/dreams/<int:dream_id>')
+def get_dream(dream_id):
+    """Get the full record of an archived dream"""
+    dream = dream_system.get_dream(dream_id)
+    if dream is None:
+        return jsonify({"success": False, "message": f"Dream {dream_id} not found"}), 404
+    return jsonify(dream)
+
+
+def get_chat_message():
+    """Get the chat message from a JSON body or the message query parameter
+
+    Returns:
+        str: The stripped message, or None if it is missing, empty or not a string
+    """
+    data = request.get_json(silent=True)
+    message = data.get('message') if isinstance(data, dict) else None
+    if message is None:
+        message = request.args.get('message')
+    if not isinstance(message, str) or not message.strip():
+        return None
+    return message.strip()
+
+
+@app.route('/api/chat', methods=['POST'])
+def chat():
+    """Send a message and get the whole response"""
+    message = get_chat_message()
+    if not message:
+        return jsonify({"success": False, "message": "No message provided"}), 400
+
+    return jsonify({
+        "success": True,
+        "response": emotional_system.process_message(message),
+        "emotional_state": emotional_system.get_state()
+    })
+
+
+def sse_event(data, event=None):
+    """Format a server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@app.route('/api/chat/stream', methods=['GET', 'POST'])
+def chat_stream():
+    """Send a message and stream the response as server-sent events
+
+    The message comes from a JSON body or, for EventSource clients, the message query
+    parameter. Each token is sent as {"token": ...}, followed by a "done" event carrying
+    the whole response. Emotions and memory are updated after the stream, off the
+    response path.
+    """
+    message = get_chat_message()
+    if not message:
+        return jsonify({"success": False, "message": "No message provided"}), 400
+
+    def generate():
+        response_text = ""
+        for text in emotional_system.stream_message(message):
+            response_text += text
+            yield sse_event({"token": text})
+        yield sse_event({"response": response_text.strip()}, event="done")
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route('/api/emotion/state')
+def get_emotion_state():
+    """Get the current emotions, recent thoughts and emotion history"""
+    return jsonify(emotional_system.get_state(
+        window=request.args.get('window', 60, type=float),
+        resolution=request.args.get('resolution', type=float)
+    ))
+
+
+@app.route('/api/llm/stats')
+def get_llm_stats():
+    """Get LLM gateway statistics (rate limiting, retries and queue waits)"""
+    return jsonify(llm_gateway.get_stats())
 
 
 @app.route('/api/memories/bulk', methods=['POST'])
@@ -109,6 +283,7 @@ def reset_system():
     """Reset all systems"""
     dream_system.reset()
     memory_system.reset()
+    emotional_system.reset()
 
     return jsonify({
         "success": True,
@@ -124,7 +299,8 @@ if __name__ == '__main__':
     try:
         # Start the dream system's background thread
         dream_system.start()
-        app.run(debug=True, use_reloader=False)
+        app.run(debug=True, use_reloader=False, threaded=True)
     finally:
         # Make sure to stop all background threads when shutting down
-        dream_system.stop()
\ No newline at end of file
+        dream_system.stop()
+        emotional_system.stop()
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""Measure chat turn latency of EmotionalSystem.process_message
+
+Runs the same conversation through the sequential and the parallel request pipeline,
+and through the parallel one with the local lexicon analyzing impact first, against a
+fake OpenAI client and memory system that only sleep, so the numbers show how the
+steps of a turn overlap rather than how fast any one service is.
+
+Usage:
+    python benchmark_chat.py --turns 50 --impact-latency 0.4 --response-latency 0.8
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+
+from emotional_system import EmotionalSystem
+
+
+class FakeLatencyClient:
+    def __init__(self, impact_latency, response_latency, jitter, seed=0):
+        """Stand-in for the OpenAI client that answers after a simulated network delay
+
+        Args:
+            impact_latency: Median seconds for an impact analysis call
+            response_latency: Median seconds for a chat response call
+            jitter: Spread of the lognormal delay (0 for fixed delays)
+            seed: Seed for the delays
+        """
+        self.impact_latency = impact_latency
+        self.response_latency = response_latency
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _delay(self, median):
+        """Sleep for a lognormally distributed time around median"""
+        with self.lock:
+            factor = self.rng.lognormvariate(0.0, self.jitter) if self.jitter else 1.0
+            self.calls += 1
+        time.sleep(median * factor)
+
+    def create(self, **request):
+        """Return an impact JSON object or a canned reply, depending on the request"""
+        if "analyze" in request["messages"][0]["content"]:
+            self._delay(self.impact_latency)
+            content = json.dumps({"joy": 0.05, "trust": 0.03})
+        else:
+            self._delay(self.response_latency)
+            content = "That sounds interesting - tell me more."
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)],
+                               usage=SimpleNamespace(total_tokens=100))
+
+
+class FakeMemorySystem:
+    def __init__(self, encode_latency, search_latency):
+        """Stand-in for MemorySystem with simulated embedding and search costs
+
+        Args:
+            encode_latency: Seconds to embed a query
+            search_latency: Seconds to search memories with an embedding
+        """
+        self.encode_latency = encode_latency
+        self.search_latency = search_latency
+        self.encodes = 0
+
+    def encode_query(self, text):
+        time.sleep(self.encode_latency)
+        self.encodes += 1
+        return [0.0]
+
+    def find_related_memories(self, text, threshold=0.6, max_results=3, query_embedding=None):
+        if query_embedding is None:
+            query_embedding = self.encode_query(text)
+        time.sleep(self.search_latency)
+        return []
+
+    def find_emotional_memories(self, text, query_embedding=None, **kwargs):
+        if query_embedding is None:
+            query_embedding = self.encode_query(text)
+        time.sleep(self.search_latency)
+        return []
+
+    def add_memory(self, text, source="conversation", importance=None, metadata=None, emotions=None):
+        return {"text": text}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run(parallel, impact_analysis, args):
+    """Run one conversation and return the per-turn latencies in seconds"""
+    client = FakeLatencyClient(args.impact_latency, args.response_latency, args.jitter, seed=args.seed)
+    memory = FakeMemorySystem(args.encode_latency, args.search_latency)
+    agent = EmotionalSystem(client, memory, seed=args.seed)
+    agent.thought_frequency = 1e9  # Keep background thoughts out of the measurement
+    agent.impact_analysis = impact_analysis
+    agent.parallel_requests = parallel
+
+    latencies = []
+    try:
+        for turn in range(args.turns):
+            started = time.perf_counter()
+            agent.process_message(f"Message number {turn} about the weather and my plans")
+            latencies.append(time.perf_counter() - started)
+    finally:
+        agent.stop()
+    return latencies, memory.encodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat turn latency")
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--impact-latency", type=float, default=0.4)
+    parser.add_argument("--response-latency", type=float, default=0.8)
+    parser.add_argument("--encode-latency", type=float, default=0.03)
+    parser.add_argument("--search-latency", type=float, default=0.005)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pipelines = (("sequential", False, "llm"),
+                 ("parallel", True, "llm"),
+                 ("parallel + lexicon", True, "local-first"))
+    for name, parallel, impact_analysis in pipelines:
+        latencies, encodes = run(parallel, impact_analysis, args)
+        print(f"{name:>18}: p50 {percentile(latencies, 0.5) * 1000:7.1f} ms  "
+              f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms  "
+              f"mean {statistics.mean(latencies) * 1000:7.1f} ms  "
+              f"query encodes {encodes}")
+
+
+if __name__ == "__main__":
+    main()
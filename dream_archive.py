@@ -0,0 +1,157 @@
+import json
+import sqlite3
+import threading
+
+# Heavy fields left out of summaries - the full record is available by id
+SUMMARY_CONSOLIDATION_FIELDS = ("count", "consolidated_text", "source")
+SUMMARY_INSIGHT_FIELDS = ("text", "value")
+
+
+class DreamArchive:
+    def __init__(self, path=":memory:"):
+        """Persistent archive of dream records, backed by SQLite
+
+        Records are indexed by id, time and early termination, and listed newest first
+        with cursor-based pagination. Each record is stored twice: in full, and as a
+        summary without the heavy fields (original memory texts, scenarios, planner
+        details) for cheap polling.
+
+        Args:
+            path: SQLite database file. ":memory:" keeps the archive for this process only.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS dreams (
+                id INTEGER PRIMARY KEY,
+                timestamp REAL NOT NULL,
+                early_termination INTEGER NOT NULL,
+                summary TEXT NOT NULL,
+                record TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS dreams_timestamp ON dreams (timestamp);
+            CREATE INDEX IF NOT EXISTS dreams_early_termination ON dreams (early_termination, id);
+        """)
+        self._connection.commit()
+
+    def save(self, record):
+        """Add a dream record, replacing any record with the same id
+
+        Args:
+            record: Dream record with at least "id" and "timestamp"
+        """
+        summary = self.summarize(record)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO dreams (id, timestamp, early_termination, summary, record) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (record["id"], record["timestamp"], int(bool(record.get("early_termination"))),
+                 json.dumps(summary, default=str), json.dumps(record, default=str))
+            )
+            self._connection.commit()
+
+    def get(self, dream_id):
+        """Get the full record of a dream
+
+        Args:
+            dream_id: Dream id
+
+        Returns:
+            dict: The dream record, or None if it is not archived
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT record FROM dreams WHERE id = ?", (dream_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list(self, limit=10, cursor=None, since=None, until=None, early_termination=None, summary=True):
+        """List dream records, newest first
+
+        Args:
+            limit: Maximum number of records to return (at least 1)
+            cursor: next_cursor from a previous page, to continue after it
+            since: Only dreams started at or after this Unix time
+            until: Only dreams started before this Unix time
+            early_termination: Only dreams that did (True) or did not (False) end early
+            summary: Return summaries instead of full records
+
+        Returns:
+            tuple: (records, next_cursor) - next_cursor is None on the last page
+        """
+        if limit < 1:
+            raise ValueError(f"limit must be at least 1: {limit}")
+
+        conditions = []
+        params = []
+        if cursor is not None:
+            conditions.append("id < ?")
+            params.append(cursor)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        if early_termination is not None:
+            conditions.append("early_termination = ?")
+            params.append(int(bool(early_termination)))
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        column = "summary" if summary else "record"
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT id, {column} FROM dreams {where} ORDER BY id DESC LIMIT ?",
+                params + [limit + 1]
+            ).fetchall()
+
+        # The extra row only tells us whether there is another page
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [json.loads(row[1]) for row in rows[:limit]], next_cursor
+
+    def next_id(self):
+        """Get the id for the next dream
+
+        Returns:
+            int: One more than the highest archived id
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT MAX(id) FROM dreams").fetchone()
+        return (row[0] or 0) + 1
+
+    def count(self):
+        """Get the number of archived dreams"""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM dreams").fetchone()[0]
+
+    def clear(self):
+        """Remove every archived dream"""
+        with self._lock:
+            self._connection.execute("DELETE FROM dreams")
+            self._connection.commit()
+
+    def summarize(self, record):
+        """Project a dream record onto the fields needed to list it
+
+        Args:
+            record: Full dream record
+
+        Returns:
+            dict: Summary with stages, consolidated texts, insights and counts
+        """
+        consolidations = record.get("consolidations", [])
+        insights = record.get("insights", [])
+        return {
+            "id": record["id"],
+            "timestamp": record["timestamp"],
+            "formatted_time": record.get("formatted_time"),
+            "duration": record.get("duration"),
+            "tokens_used": record.get("tokens_used"),
+            "early_termination": record.get("early_termination", False),
+            "termination_reason": record.get("termination_reason"),
+            "stages": record.get("stages", []),
+            "consolidations": [{k: c.get(k) for k in SUMMARY_CONSOLIDATION_FIELDS} for c in consolidations],
+            "insights": [{k: i.get(k) for k in SUMMARY_INSIGHT_FIELDS} for i in insights],
+            "scenarios_count": len(record.get("scenarios", [])),
+            "consolidations_count": len(consolidations),
+            "insights_count": len(insights)
+        }
@@ -0,0 +1,164 @@
+import re
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+class DreamPlanner:
+    def __init__(self, min_value_per_1k_tokens=0.25, prior_yield=0.5, prior_weight=2):
+        """Cost model that decides whether a dream LLM call is worth making
+
+        Each candidate call gets an expected value in 0-1 from its inputs (group size,
+        importance, novelty against what already exists) scaled by the historical yield
+        of its stage, as recorded in dream_records. Calls whose value per 1000 estimated
+        tokens falls below the threshold are skipped before any tokens are spent.
+
+        Args:
+            min_value_per_1k_tokens: Minimum expected value per 1000 tokens for a call
+            prior_yield: Yield assumed for a stage with no history
+            prior_weight: How many calls' worth of weight the prior carries
+        """
+        self.min_value_per_1k_tokens = min_value_per_1k_tokens
+        self.prior_yield = prior_yield
+        self.prior_weight = prior_weight
+
+    def historical_yield(self, dream_records, stage):
+        """Average value per call a stage has produced in past dream cycles
+
+        Args:
+            dream_records: Past dream records
+            stage: Dream stage name
+
+        Returns:
+            float: Smoothed yield between 0-1
+        """
+        calls = 0
+        value = 0.0
+        for record in dream_records:
+            stage_yield = record.get("llm_yield", {}).get(stage)
+            if stage_yield:
+                calls += stage_yield["calls"]
+                value += stage_yield["value"]
+
+        return (value + self.prior_yield * self.prior_weight) / (calls + self.prior_weight)
+
+    def consolidation_value(self, memory_group, consolidated_memories, dream_records):
+        """Expected value of consolidating a group of memories
+
+        Args:
+            memory_group: Memories that would be consolidated
+            consolidated_memories: Existing consolidated memories
+            dream_records: Past dream records
+
+        Returns:
+            float: Expected value between 0-1
+        """
+        # Larger groups remove more redundancy, with diminishing returns
+        size_factor = min(1.0, (len(memory_group) - 1) / 4.0)
+        avg_importance = sum(m.get("importance", 0.2) for m in memory_group) / len(memory_group)
+
+        # A group that says what an existing consolidation already says adds little
+        group_text = " ".join(m["text"] for m in memory_group)
+        novelty = self.novelty(group_text, [m["text"] for m in consolidated_memories])
+
+        base_value = 0.5 * size_factor + 0.3 * avg_importance + 0.2
+        return base_value * novelty * self.historical_yield(dream_records, "consolidation")
+
+    def consolidation_yield(self, consolidated_text, memory_group, consolidated_memories):
+        """Value a consolidation call actually produced
+
+        A consolidation is worth the redundancy it removes (how much shorter it is than
+        its sources) and the importance of what it covers, and only if it says something
+        the existing consolidations do not.
+
+        Args:
+            consolidated_text: Text the call returned
+            memory_group: Memories that were consolidated
+            consolidated_memories: Consolidated memories that existed before this one
+
+        Returns:
+            float: Value between 0-1 (0 for an empty consolidation)
+        """
+        consolidated_words = len(_WORD_PATTERN.findall(consolidated_text or ""))
+        source_words = sum(len(_WORD_PATTERN.findall(m["text"])) for m in memory_group)
+        if not consolidated_words or not source_words:
+            return 0.0
+
+        compression = max(0.0, 1.0 - consolidated_words / source_words)
+        avg_importance = sum(m.get("importance", 0.2) for m in memory_group) / len(memory_group)
+        novelty = self.novelty(consolidated_text, [m["text"] for m in consolidated_memories])
+        return novelty * (0.7 * compression + 0.3 * avg_importance)
+
+    def scenario_value(self, context_memories, existing_scenarios, dream_records):
+        """Expected value of generating scenarios from a set of context memories
+
+        Args:
+            context_memories: Memories used as scenario context
+            existing_scenarios: Previously generated scenarios
+            dream_records: Past dream records
+
+        Returns:
+            float: Expected value between 0-1
+        """
+        if not context_memories:
+            return 0.0
+
+        avg_importance = sum(m.get("importance", 0.5) for m in context_memories) / len(context_memories)
+        context_text = " ".join(m["text"] for m in context_memories)
+        novelty = self.novelty(context_text, [s.get("relevance", "") + " " + s.get("scenario", "")
+                                              for s in existing_scenarios])
+
+        base_value = 0.5 + 0.5 * avg_importance
+        return base_value * novelty * self.historical_yield(dream_records, "hypothesis")
+
+    def insight_value(self, scenarios, dream_records):
+        """Expected value of generating insights from scenarios
+
+        Args:
+            scenarios: Scenarios the insights would be drawn from
+            dream_records: Past dream records
+
+        Returns:
+            float: Expected value between 0-1
+        """
+        if not scenarios:
+            return 0.0
+
+        avg_probability = sum(s.get("probability", 0.5) for s in scenarios) / len(scenarios)
+        base_value = 0.5 + 0.5 * avg_probability
+        return base_value * self.historical_yield(dream_records, "insight")
+
+    def novelty(self, text, existing_texts):
+        """How different a text is from the most similar existing text (word overlap)
+
+        Args:
+            text: Candidate text
+            existing_texts: Texts to compare against
+
+        Returns:
+            float: 1 for entirely new content, 0 for a duplicate
+        """
+        words = set(_WORD_PATTERN.findall(text.lower()))
+        if not words:
+            return 0.0
+
+        max_similarity = 0.0
+        for existing_text in existing_texts:
+            existing_words = set(_WORD_PATTERN.findall(existing_text.lower()))
+            if existing_words:
+                similarity = len(words & existing_words) / len(words | existing_words)
+                max_similarity = max(max_similarity, similarity)
+
+        return 1.0 - max_similarity
+
+    def should_call(self, expected_value, estimated_tokens):
+        """Whether a call's expected value justifies its token cost
+
+        Args:
+            expected_value: Expected value between 0-1
+            estimated_tokens: Estimated prompt plus completion tokens
+
+        Returns:
+            bool: Whether to make the call
+        """
+        value_per_1k_tokens = expected_value * 1000 / max(1, estimated_tokens)
+        return value_per_1k_tokens >= self.min_value_per_1k_tokens
@@ -2,35 +2,109 @@ import threading
 import time
 import random
 import json
+import os
+import itertools
 from datetime import datetime
 import numpy as np
 
+from dream_planner import DreamPlanner
+from llm_gateway import (LLMGateway, TokenBudget, BudgetExhausted, CancellationToken, Cancelled,
+                         JsonArrayStream, BACKGROUND)
+from prompt_packing import estimate_tokens, pack_memories
+from single_flight import SingleFlight
+from stage_graph import StageGraph
+from versioned_snapshot import VersionedSnapshot
+from dream_archive import DreamArchive
+
+# Supported pacing modes for dream cycle stages
+PACING_MODES = ("realtime", "fast", "min-duration")
+
 
 class DreamSystem:
-    def __init__(self, client, memory_system):
+    def __init__(self, client, memory_system, llm_gateway=None, checkpoint_path=None, archive_path=None):
         """Initialize the Dream System
 
         Args:
             client: OpenAI client for generating dreams and scenarios
             memory_system: Reference to the MemorySystem for accessing and updating memories
+            llm_gateway: Shared LLMGateway for rate limiting and retries. Created if not given.
+            checkpoint_path: File dream cycle checkpoints are written to. If None, checkpoints
+                are only kept in memory (retries resume, restarts do not).
+            archive_path: SQLite file all dream records are archived to. If None, the
+                archive is only kept in memory.
         """
         self.client = client
         self.memory_system = memory_system
-
-        # Dream state and records
+        self.llm = llm_gateway or LLMGateway(client)
+
+        # Dream state and records - the record lists are copy-on-write, replaced under
+        # state_lock, so get_state and API readers never need the lock
+        self.state_lock = threading.Lock()
+        self._versions = itertools.count(1)
+        self.state_version = 0  # Changed whenever state shown by get_state or get_recent_dreams changes
+        self.records_version = 0  # Changed whenever the archive changes
+        self.state_snapshot = VersionedSnapshot(self._build_state)
+        self.records_snapshot = VersionedSnapshot(lambda: self.get_recent_dreams())
         self.current_dream = None
-        self.dream_records = []
+
+        # Every dream is archived - dream_records only holds the recent ones the planner learns from
+        self.archive = DreamArchive(archive_path or ":memory:")
+        self.dream_records = list(reversed(self.archive.list(limit=10, summary=False)[0]))
         self.consolidated_memories = []
         self.hypothetical_scenarios = []
         self.dream_insights = []
 
         # Configuration parameters
         self.dream_frequency = 60  # How often to dream (in seconds)
-        self.dream_duration = 30  # How long a dream cycle lasts (in seconds)
         self.consolidation_threshold = 0.4  # Memories below this importance are consolidated
         self.dreaming = False
         self.current_stage = "idle"
 
+        # Pacing parameters - "realtime" keeps the visual stage delays, "fast" removes them,
+        # "min-duration" only sleeps for whatever remains of stage_min_duration after real work
+        self.pacing_mode = "realtime"
+        self.stage_min_duration = 5  # Seconds each stage lasts for UI visualization
+        self.cycle_pacing_mode = None  # Pacing override for the cycle in progress
+        self.stage_concurrency = 2  # Max dream stages running at the same time
+
+        # Incremental dreaming - only seed similarity groups from memories added since the last
+        # successful cycle, and never top up the selection with processed memories
+        self.incremental_dreaming = False
+        self.dream_watermark = 0  # Memory revision covered by the last successful cycle
+
+        # Stream scenario and insight completions, pushing each object to current_dream as it arrives
+        self.streaming_enabled = False
+        # Partial results held back until the cycle is known to continue (key -> items, or None once released)
+        self.held_partials = {}
+        self.partial_lock = threading.Lock()
+
+        # Prompt packing - tokens available for memory texts in each stage's prompt
+        self.prompt_token_budgets = {"consolidation": 400, "hypothesis": 300}
+        self.max_memory_prompt_tokens = 80  # Longer memory texts are trimmed
+
+        # Cost-model planner - skips calls whose expected value per token is too low
+        self.planner = DreamPlanner()
+        self.planning_enabled = True
+
+        # Checkpointing - cycles save progress after each stage and consolidation group so a
+        # failed or interrupted cycle resumes without repeating its LLM calls
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint = None  # Checkpoint of the cycle in progress
+        self.saved_checkpoint = None  # Last saved checkpoint (JSON) when not using a file
+        self.checkpoint_lock = threading.Lock()
+        self.max_resume_attempts = 3  # Runs of one checkpointed cycle before a failing one is dropped
+
+        # Cancellation - cycles check their token between stages and consolidation groups,
+        # and LLM calls are bounded by a per-call timeout and the cycle's deadline
+        self.cycle_timeout = 300  # Deadline for a whole dream cycle (seconds, None = no deadline)
+        self.llm_call_timeout = 60  # Timeout for each LLM call attempt (seconds)
+        self.cancel_token = None  # Token of the cycle in progress
+        self.discard_cancelled_cycle = False  # Set by reset so a cancelled cycle leaves no record
+
+        # LLM token budget per dream cycle (None = unlimited)
+        self.cycle_token_budget = None
+        self.cycle_budget = None
+
         # Optimization parameters
         self.diminishing_returns_threshold = 0.3  # Threshold for early termination
         self.early_termination_enabled = True  # Whether to enable early termination
@@ -42,50 +116,227 @@ class DreamSystem:
         self.background_thread = None
         self.last_dream_time = 0
 
+        # Adaptive auto-dream scheduling - dream pressure (0-1) rises with the size and age
+        # of the backlog of memories that can be consolidated, and time since the last
+        # dream. A cycle starts when pressure reaches the high watermark, and the scheduler
+        # re-arms once pressure falls below the low watermark (or dream_frequency has
+        # passed) so it does not thrash around one level. Each auto cycle that consolidates
+        # nothing doubles the time before a re-arm, up to max_auto_dream_backoff times.
+        self.backlog_target = 15  # Unprocessed memories that count as a full backlog
+        self.max_backlog_age = 300  # Seconds an unprocessed memory may wait
+        self.auto_dream_high_watermark = 0.7
+        self.auto_dream_low_watermark = 0.3
+        self.max_request_load = 0.7  # Don't auto-dream while request load is above this
+        self.min_llm_headroom = 0.3  # Don't auto-dream with less LLM quota than this available
+        self.auto_dream_check_interval = 30  # Seconds between checks when no memories arrive
+        self.load_probe = None  # Optional callable returning current request load (0-1)
+        self.auto_dream_armed = True
+        self.last_auto_dream_time = 0
+        self.auto_dream_backoff = 1  # Multiplier on dream_frequency before re-arming
+        self.max_auto_dream_backoff = 16
+        self.trigger_flight = SingleFlight()  # Concurrent triggers share one dream cycle
+
     def start(self):
-        """Start the background monitoring thread"""
+        """Start the background scheduling thread"""
         if not self.running:
             self.running = True
             self.background_thread = threading.Thread(target=self._background_process)
             self.background_thread.daemon = True
             self.background_thread.start()
-            print("Dream system started (monitoring only)")
+            print(f"Dream system started (auto-dreaming {'enabled' if self.auto_dreaming_enabled else 'disabled'})")
 
     def stop(self):
-        """Stop the background monitoring thread"""
+        """Stop the background scheduling thread and cancel the dream cycle in progress"""
         self.running = False
+        self.cancel_dream_cycle("Dream system stopped")
+        self.memory_system.memory_added.set()  # Wake the thread so it sees running is False
         if self.background_thread and self.background_thread.is_alive():
             self.background_thread.join(timeout=2.0)
             print("Dream system stopped")
 
     def _background_process(self):
-        """Background process for monitoring but not automatically triggering dreams"""
+        """Background scheduler that starts dream cycles when dream pressure builds up
+
+        Wakes whenever a memory is added, and every auto_dream_check_interval seconds so
+        backlog age and time since the last dream are still noticed when input stops.
+        """
         while self.running:
-            # This thread now only monitors the system and doesn't auto-trigger dreams
-            # It could still update UI elements or perform other monitoring tasks
+            self.memory_system.memory_added.wait(timeout=self.auto_dream_check_interval)
+            self.memory_system.memory_added.clear()
 
-            # For example, it could update the count of unprocessed memories for display
-            unprocessed_count = len(self.memory_system.get_unprocessed_memories())
-            if unprocessed_count > 15:
-                print(f"System has {unprocessed_count} unprocessed memories ready for dreaming")
+            if self.running and self.auto_dreaming_enabled:
+                self._maybe_auto_dream()
+
+    def _dream_pressure(self):
+        """Calculate how urgently a dream cycle is needed
+
+        Returns:
+            float: Dream pressure between 0-1
+        """
+        # Only memories a cycle could consolidate - important ones are never selected, so
+        # counting them would keep pressure up however often we dream
+        backlog = [m for m in self.memory_system.get_unprocessed_memories()
+                   if m.get("importance", 0) <= self.consolidation_threshold]
+        if not backlog:
+            return 0.0
+
+        now = time.time()
+        size_factor = min(1.0, len(backlog) / self.backlog_target)
+        backlog_age = now - min(m.get("timestamp", now) for m in backlog)
+        age_factor = min(1.0, backlog_age / self.max_backlog_age)
+        time_factor = min(1.0, (now - self.last_dream_time) / self.dream_frequency)
+
+        # A full or stale backlog is enough on its own; time since the last dream adds
+        # urgency to a partial backlog
+        return max(size_factor, age_factor, 0.5 * size_factor + 0.5 * time_factor)
+
+    def _maybe_auto_dream(self):
+        """Start a dream cycle if pressure is high enough and the system has capacity
+
+        Returns:
+            dict: Summary of the dream cycle, or None if no cycle was started
+        """
+        pressure = self._dream_pressure()
+
+        # Hysteresis - re-arm once pressure has dropped or enough time has passed
+        if not self.auto_dream_armed:
+            if (pressure < self.auto_dream_low_watermark or
+                    time.time() - self.last_auto_dream_time > self.dream_frequency * self.auto_dream_backoff):
+                self.auto_dream_armed = True
+            else:
+                return None
 
-            # Sleep for a while before checking again
-            time.sleep(5)
+        if pressure < self.auto_dream_high_watermark:
+            return None
 
-    def trigger_dream_cycle(self):
+        # Leave room for user requests and for the LLM quota they need
+        request_load = self.load_probe() if self.load_probe else 0.0
+        if request_load > self.max_request_load:
+            print(f"Deferring auto-dream: request load {request_load:.2f} is too high")
+            return None
+
+        if self.client and self.llm.headroom() < self.min_llm_headroom:
+            print("Deferring auto-dream: not enough LLM quota headroom")
+            return None
+
+        print(f"Auto-dream triggered (pressure {pressure:.2f})")
+        self.auto_dream_armed = False
+        self.last_auto_dream_time = time.time()
+
+        # Shares the single dream-cycle flight with manual triggers, so at most one cycle runs
+        result = self.trigger_flight.do("dream-cycle", self._dream_cycle)
+
+        # Back off while cycles find nothing to consolidate, so a stuck backlog does not
+        # start a full cycle every dream_frequency forever
+        if result and "dream_id" in result:
+            if result.get("memories_consolidated", 0):
+                self.auto_dream_backoff = 1
+            else:
+                self.auto_dream_backoff = min(self.max_auto_dream_backoff, self.auto_dream_backoff * 2)
+                print(f"Auto-dream consolidated nothing, backing off to {self.auto_dream_backoff}x dream_frequency")
+        return result
+
+    def set_auto_dreaming(self, enabled):
+        """Turn automatic dreaming on or off
+
+        Args:
+            enabled: Whether the background scheduler may start dream cycles
+        """
+        self.auto_dreaming_enabled = bool(enabled)
+        self.auto_dream_armed = True
+        self.auto_dream_backoff = 1
+        self._state_changed()
+        self.memory_system.memory_added.set()  # Wake the scheduler to check pressure now
+
+    def trigger_dream_cycle(self, pacing_mode=None, resume=True):
         """Manually trigger a dream cycle
 
+        Triggers arriving while a triggered cycle with the same options is running wait
+        for it and share its summary instead of being turned away. A trigger with other
+        options is turned away with an "already_dreaming" status rather than handed a
+        cycle it did not ask for.
+
+        Args:
+            pacing_mode: Optional pacing override for this cycle ("realtime", "fast" or
+                "min-duration"). Defaults to the system-wide pacing_mode.
+            resume: Resume an interrupted cycle from its checkpoint if there is one.
+                Otherwise the checkpoint is discarded and a new cycle starts.
+
         Returns:
             dict: Summary of dream cycle
         """
+        if pacing_mode is not None and pacing_mode not in PACING_MODES:
+            return {"status": "error", "message": f"Unknown pacing mode: {pacing_mode}"}
+
         print("Dream cycle manually triggered")
-        return self._dream_cycle()
+        return self.trigger_flight.do(
+            ("dream-cycle", pacing_mode, resume),
+            lambda: self._dream_cycle(pacing_mode=pacing_mode, resume=resume)
+        )
+
+    def cancel_dream_cycle(self, reason="Cancelled by user"):
+        """Cancel the dream cycle in progress
+
+        The cycle stops at its next stage or consolidation group, or as soon as its
+        current LLM call returns or times out, and keeps the results it already has.
 
-    def _calculate_optimization_value(self, stage_data):
+        Args:
+            reason: Why the cycle was cancelled
+
+        Returns:
+            bool: Whether a cycle was running
+        """
+        cancel_token = self.cancel_token
+        if cancel_token is None:
+            return False
+
+        print(f"Cancelling dream cycle: {reason}")
+        cancel_token.cancel(reason)
+        return True
+
+    def set_pacing_mode(self, pacing_mode):
+        """Set the default pacing mode used by dream cycles
+
+        Args:
+            pacing_mode: One of "realtime", "fast" or "min-duration"
+        """
+        if pacing_mode not in PACING_MODES:
+            raise ValueError(f"Unknown pacing mode: {pacing_mode}")
+        self.pacing_mode = pacing_mode
+
+    def _active_pacing_mode(self):
+        """Get the pacing mode for the cycle in progress"""
+        return self.cycle_pacing_mode or self.pacing_mode
+
+    def _pace_stage_start(self):
+        """Delay at the start of a stage when pacing in realtime"""
+        if self._active_pacing_mode() == "realtime":
+            self._sleep(self.stage_min_duration)  # Simulate processing time for UI visualization
+
+    def _pace_stage_end(self, stage_start_time):
+        """Pad a finished stage up to stage_min_duration when pacing in min-duration mode
+
+        Args:
+            stage_start_time: When the stage started
+        """
+        if self._active_pacing_mode() == "min-duration":
+            remaining = self.stage_min_duration - (time.time() - stage_start_time)
+            if remaining > 0:
+                self._sleep(remaining)
+
+    def _sleep(self, seconds):
+        """Sleep during a cycle, waking early if the cycle is cancelled"""
+        if self.cancel_token is not None:
+            self.cancel_token.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+    def _calculate_optimization_value(self, stage_data, stage=None):
         """Calculate a value to determine if dreaming should continue
 
         Args:
             stage_data: Data about the current dream stage
+            stage: Stage the data belongs to. Defaults to the current stage.
 
         Returns:
             float: Optimization value between 0-1
@@ -100,9 +351,10 @@ class DreamSystem:
         # 1. How many memories were processed in this stage
         # 2. How significant the results were (quality of consolidations/insights)
         # 3. How many unprocessed memories remain
+        stage = stage or self.current_stage
 
         # For consolidation stage:
-        if self.current_stage == "consolidation":
+        if stage == "consolidation":
             if "consolidations" in stage_data:
                 # More consolidations = higher value
                 consolidation_count = len(stage_data["consolidations"])
@@ -111,7 +363,7 @@ class DreamSystem:
                 return consolidation_factor
 
         # For hypothesis stage:
-        elif self.current_stage == "hypothesis":
+        elif stage == "hypothesis":
             if "scenarios" in stage_data:
                 # More varied scenarios = higher value
                 scenario_count = len(stage_data["scenarios"])
@@ -125,7 +377,7 @@ class DreamSystem:
                 return 0.7 * scenario_factor + 0.3 * avg_probability
 
         # For insight stage:
-        elif self.current_stage == "insight":
+        elif stage == "insight":
             if "insights" in stage_data:
                 # More valuable insights = higher value
                 insight_count = len(stage_data["insights"])
@@ -140,7 +392,7 @@ class DreamSystem:
                 return 0.4 * min(1.0, insight_count / 3.0) + 0.6 * avg_value
 
         # Memory selection stage - value based on available memories
-        elif self.current_stage == "memory-selection":
+        elif stage == "memory-selection":
             unprocessed_count = len(self.memory_system.get_unprocessed_memories())
             # If we have many unprocessed memories, high value in continuing
             return min(1.0, unprocessed_count / 10.0)
@@ -148,11 +400,12 @@ class DreamSystem:
         # Default fallback
         return 0.5
 
-    def _should_continue_dreaming(self, stage_data):
+    def _should_continue_dreaming(self, stage_data, stage=None):
         """Determine if dreaming should continue based on optimization
 
         Args:
             stage_data: Data about the current dream stage
+            stage: Stage the data belongs to. Defaults to the current stage.
 
         Returns:
             bool: Whether to continue dreaming
@@ -161,7 +414,7 @@ class DreamSystem:
             return True  # Always continue if optimization is disabled
 
         # Calculate current optimization value
-        current_value = self._calculate_optimization_value(stage_data)
+        current_value = self._calculate_optimization_value(stage_data, stage=stage)
 
         # Marginal benefit is difference from last value
         marginal_benefit = current_value - self.last_optimization_value
@@ -180,7 +433,7 @@ class DreamSystem:
 
         return True
 
-    def _dream_cycle(self):
+    def _dream_cycle(self, pacing_mode=None, resume=True):
         """Run a complete dream cycle
 
         A dream cycle consists of:
@@ -189,122 +442,103 @@ class DreamSystem:
         3. Insight generation - drawing conclusions from scenarios
         4. Memory update - storing insights and consolidated memories
 
+        The stages run as a dependency graph (see _build_stage_graph), so scenario
+        generation runs alongside consolidation instead of waiting for it.
+
+        Progress is checkpointed after each stage and consolidation group. If a previous
+        cycle failed or was interrupted, it is resumed from its checkpoint and completed
+        stages and groups are not run again.
+
+        Args:
+            pacing_mode: Optional pacing override for this cycle
+            resume: Resume from a saved checkpoint if there is one
+
         Returns:
             dict: Summary of the dream cycle
         """
-        if self.dreaming:
-            return {"status": "already_dreaming", "message": "Dream cycle already in progress"}
+        # Check and claim the dreaming flag atomically so two cycles can never start together
+        with self.state_lock:
+            if self.dreaming:
+                return {"status": "already_dreaming", "message": "Dream cycle already in progress"}
+            self.dreaming = True
+            self._state_changed()
 
         try:
             print("Starting dream cycle")
-            self.dreaming = True
+            self.cycle_pacing_mode = pacing_mode
             cycle_start_time = time.time()
-            self.current_dream = {
-                "id": len(self.dream_records) + 1,
-                "timestamp": cycle_start_time,
-                "formatted_time": datetime.fromtimestamp(cycle_start_time).strftime('%Y-%m-%d %H:%M:%S'),
-                "stages": [],
-                "consolidations": [],
-                "scenarios": [],
-                "insights": []
-            }
-
-            # Reset optimization tracking
-            self.last_optimization_value = 0
-
-            # Stage 1: Memory Importance Assessment & Consolidation
-            self._update_dream_stage("memory-selection")
-            print("Memory selection stage started")
-            time.sleep(5)  # Simulate processing time for UI visualization
 
-            # Get memories below the consolidation threshold
-            memories_to_consolidate = self.memory_system.get_memories_by_importance(
-                max_importance=self.consolidation_threshold,
-                min_count=3
-            )
-
-            # Also look for similar memory content
-            similar_memories = self.memory_system.find_similar_memories()
-            for group in similar_memories:
-                memories_to_consolidate.extend(group)
-
-            # Remove duplicates
-            unique_ids = set()
-            filtered_memories = []
-            for memory in memories_to_consolidate:
-                if memory.get("id") not in unique_ids:
-                    filtered_memories.append(memory)
-                    unique_ids.add(memory.get("id"))
-
-            memories_to_consolidate = filtered_memories
-
-            # Check optimization after memory selection
-            stage_data = {"memory_count": len(memories_to_consolidate)}
-            if not self._should_continue_dreaming(stage_data):
-                raise Exception("Dream cycle terminated early: Not enough valuable memories to consolidate")
-
-            if memories_to_consolidate:
-                self._update_dream_stage("consolidation")
-                print("Consolidation stage started")
-                time.sleep(5)  # Simulate processing time for UI visualization
-
-                consolidated = self._consolidate_memories(memories_to_consolidate)
-                self.current_dream["consolidations"] = consolidated
-
-                # Check optimization after consolidation
-                stage_data = {"consolidations": consolidated}
-                if not self._should_continue_dreaming(stage_data):
-                    # End dream early but still save what we've done
-                    print("Dream cycle ending early after consolidation due to optimization")
-                    return self._finalize_dream(cycle_start_time)
+            # Calls stop being issued once the cycle's token budget is spent
+            self.cycle_budget = TokenBudget(self.cycle_token_budget)
+            # Cleared before the token exists, so a reset that cancels this cycle also discards it
+            self.discard_cancelled_cycle = False
+            self.cancel_token = CancellationToken(self.cycle_timeout)
+
+            checkpoint = self._load_checkpoint() if resume else None
+            if checkpoint:
+                print(f"Resuming dream cycle {checkpoint['dream']['id']} from checkpoint")
+                self.checkpoint = checkpoint
+                self.checkpoint["attempts"] = checkpoint.get("attempts", 1) + 1
+                self.current_dream = checkpoint["dream"]
+                self.last_optimization_value = checkpoint["last_optimization_value"]
+                self._save_checkpoint()  # Count the attempt even if no stage completes
             else:
-                self._update_dream_stage("memory-selection")
-                self.current_dream["stages"].append({
-                    "description": "No memories found for consolidation",
-                    "timestamp": time.time()
-                })
+                self.current_dream = {
+                    "id": self.archive.next_id(),
+                    "timestamp": cycle_start_time,
+                    "formatted_time": datetime.fromtimestamp(cycle_start_time).strftime('%Y-%m-%d %H:%M:%S'),
+                    "stages": [],
+                    "consolidations": [],
+                    "scenarios": [],
+                    "insights": []
+                }
 
-            # Stage 2: Hypothetical Scenario Generation
-            self._update_dream_stage("hypothesis")
-            print("Hypothesis generation stage started")
-            time.sleep(5)  # Simulate processing time for UI visualization
-
-            scenarios = self._generate_scenarios()
-            self.current_dream["scenarios"] = scenarios
-
-            # Check optimization after scenario generation
-            stage_data = {"scenarios": scenarios}
-            if not self._should_continue_dreaming(stage_data):
-                # End dream early but still save what we've done
-                print("Dream cycle ending early after scenario generation due to optimization")
-                return self._finalize_dream(cycle_start_time)
-
-            # Stage 3: Insight Generation
-            if scenarios:
-                self._update_dream_stage("insight")
-                print("Insight formation stage started")
-                time.sleep(5)  # Simulate processing time for UI visualization
-
-                insights = self._generate_insights(scenarios)
-                self.current_dream["insights"] = insights
-
-                # Store valuable insights as new memories
-                for insight in insights:
-                    if insight.get("value", 0) > 0.6:  # Only store valuable insights
-                        self.memory_system.add_insight(
-                            insight["text"],
-                            importance=insight["value"],
-                            metadata={"dream_id": self.current_dream["id"]}
-                        )
-
-                # Check optimization after insight generation
-                stage_data = {"insights": insights}
-                if not self._should_continue_dreaming(stage_data):
-                    print("Dream cycle completed all stages but optimization suggests no further benefit")
+                # Reset optimization tracking
+                self.last_optimization_value = 0
+
+                # Memories added after this point are left for the next incremental cycle
+                self.checkpoint = {
+                    "dream": self.current_dream,
+                    "revision": self.memory_system.revision,
+                    "memory_generation": self.memory_system.generation,
+                    "last_optimization_value": 0,
+                    "stages": {},
+                    "completed_groups": [],
+                    "attempts": 1  # Runs of this cycle, including resumes
+                }
+                self._save_checkpoint()
+
+            cycle_revision = self.checkpoint["revision"]
+
+            # Scenarios stream in alongside consolidation, so they are only shown once its
+            # early-termination check has let the cycle continue
+            saved_consolidation = self.checkpoint["stages"].get("consolidation")
+            with self.partial_lock:
+                if saved_consolidation is not None and not saved_consolidation["halted"]:
+                    self.held_partials = {}
+                else:
+                    self.held_partials = {"partial_scenarios": []}
+
+            # Run the stages - any stage can halt the graph when optimization suggests stopping
+            graph = self._build_stage_graph()
+            _, halted_stage = graph.run(max_workers=self.stage_concurrency)
+            if halted_stage:
+                print(f"Dream cycle ended early at {halted_stage} stage")
+
+            self.dream_watermark = cycle_revision
 
             # Finalize the dream record
             return self._finalize_dream(cycle_start_time)
 
+        except Cancelled as e:
+            print(f"Dream cycle cancelled: {e}")
+            if self.discard_cancelled_cycle:
+                # Cancelled by reset - the cycle's results are discarded along with everything else
+                self._clear_checkpoint()
+                return {"status": "cancelled", "message": str(e)}
+
+            # Keep the partial results - the checkpoint lets a later cycle pick up from here
+            return self._finalize_dream(cycle_start_time, error=f"Cancelled: {e}")
         except Exception as e:
             print(f"Error in dream cycle: {e}")
             if self.current_dream:
@@ -313,7 +547,338 @@ class DreamSystem:
         finally:
             self._update_dream_stage("idle")
             self.dreaming = False
+            self.cycle_pacing_mode = None
+            self.cycle_budget = None
+            self.cancel_token = None
+            self.checkpoint = None
             self.current_dream = None
+            self._state_changed()
+
+    def _build_stage_graph(self):
+        """Build the dependency graph of dream stages
+
+        Scenario generation only reads important and recent memories, so it depends on
+        memory selection but not on consolidation. Its scenarios are held back until the
+        hypothesis-review stage, which runs after consolidation, so the early-termination
+        checks still happen in the original stage order.
+
+        Returns:
+            StageGraph: The dream stage graph
+        """
+        graph = StageGraph()
+        graph.add_stage("memory-selection", self._checkpointed_stage(
+            "memory-selection", self._run_memory_selection_stage,
+            serialize=lambda memories: [m.get("id") for m in memories],
+            deserialize=self.memory_system.get_memories_by_ids
+        ))
+        graph.add_stage("consolidation", self._checkpointed_stage(
+            "consolidation", self._run_consolidation_stage), depends_on=["memory-selection"])
+        graph.add_stage("hypothesis", self._checkpointed_stage(
+            "hypothesis", self._run_hypothesis_stage), depends_on=["memory-selection"])
+        graph.add_stage("hypothesis-review", self._checkpointed_stage(
+            "hypothesis-review", self._run_hypothesis_review_stage), depends_on=["consolidation", "hypothesis"])
+        graph.add_stage("insight", self._checkpointed_stage(
+            "insight", self._run_insight_stage), depends_on=["hypothesis-review"])
+        return graph
+
+    def _checkpointed_stage(self, name, func, serialize=None, deserialize=None):
+        """Wrap a stage so its outcome is checkpointed and replayed when a cycle resumes
+
+        Args:
+            name: Stage name
+            func: Stage function
+            serialize: Optional function converting the result to JSON-safe data
+            deserialize: Optional function restoring the result from that data
+
+        Returns:
+            callable: The wrapped stage function
+        """
+        def run_stage(inputs):
+            # Stop between stages once the cycle is cancelled
+            self.cancel_token.check()
+
+            saved = self.checkpoint["stages"].get(name)
+            if saved is not None:
+                print(f"Skipping {name} stage - already completed before the checkpoint")
+                if saved["halted"]:
+                    return StageGraph.HALT
+                return deserialize(saved["result"]) if deserialize else saved["result"]
+
+            result = func(inputs)
+
+            halted = result is StageGraph.HALT
+            if not halted and serialize:
+                saved_result = serialize(result)
+            else:
+                saved_result = None if halted else result
+
+            with self.checkpoint_lock:
+                self.checkpoint["stages"][name] = {"halted": halted, "result": saved_result}
+            self._save_checkpoint()
+            return result
+
+        return run_stage
+
+    def _save_checkpoint(self):
+        """Persist the checkpoint of the cycle in progress"""
+        if self.checkpoint is None:
+            return
+
+        # Checkpoints follow each stage and consolidation group, so the dream has changed
+        self._state_changed()
+
+        with self.checkpoint_lock:
+            self.checkpoint["last_optimization_value"] = self.last_optimization_value
+            checkpoint = dict(self.checkpoint, dream=self._snapshot_dream() or self.checkpoint["dream"])
+            data = json.dumps(checkpoint, default=str)
+
+            if not self.checkpoint_path:
+                self.saved_checkpoint = data
+                return
+
+            try:
+                # Write to a temporary file first so a crash never leaves a half-written checkpoint
+                temp_path = self.checkpoint_path + ".tmp"
+                with open(temp_path, "w") as f:
+                    f.write(data)
+                os.replace(temp_path, self.checkpoint_path)
+            except OSError as e:
+                print(f"Error saving dream checkpoint: {e}")
+
+    def _load_checkpoint(self):
+        """Load the saved checkpoint of an unfinished cycle
+
+        A checkpoint saved against another memory store (e.g. before a restart, since
+        memories are not persisted) refers to memory ids and revisions that no longer
+        mean the same thing, so it is dropped, as is one with no completed work.
+
+        Returns:
+            dict: The checkpoint, or None if there is none worth resuming
+        """
+        data = self.saved_checkpoint
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            try:
+                with open(self.checkpoint_path) as f:
+                    data = f.read()
+            except OSError as e:
+                print(f"Error loading dream checkpoint: {e}")
+
+        if not data:
+            return None
+
+        try:
+            checkpoint = json.loads(data)
+        except json.JSONDecodeError as e:
+            print(f"Ignoring unreadable dream checkpoint: {e}")
+            return None
+
+        if checkpoint.get("memory_generation") != self.memory_system.generation:
+            print("Discarding dream checkpoint saved against a different memory store")
+            self._clear_checkpoint()
+            return None
+        if not self._checkpoint_has_work(checkpoint):
+            self._clear_checkpoint()
+            return None
+        return checkpoint
+
+    def _clear_checkpoint(self):
+        """Remove the saved checkpoint once a cycle no longer needs resuming"""
+        with self.checkpoint_lock:
+            self.saved_checkpoint = None
+            if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+                try:
+                    os.remove(self.checkpoint_path)
+                except OSError as e:
+                    print(f"Error removing dream checkpoint: {e}")
+
+    def _checkpoint_has_work(self, checkpoint=None):
+        """Whether a checkpoint (by default the current one) holds completed LLM work worth resuming"""
+        checkpoint = checkpoint if checkpoint is not None else self.checkpoint
+        if checkpoint is None:
+            return False
+        completed_stages = set(checkpoint.get("stages", {})) - {"memory-selection"}
+        return bool(completed_stages or checkpoint.get("completed_groups"))
+
+    def _run_memory_selection_stage(self, inputs):
+        """Stage 1: Memory importance assessment - select memories to consolidate
+
+        Args:
+            inputs: Results of the stages this one depends on (none)
+
+        Returns:
+            list: Memories selected for consolidation
+        """
+        self._update_dream_stage("memory-selection")
+        print("Memory selection stage started")
+        stage_start_time = time.time()
+        self._pace_stage_start()
+
+        if self.incremental_dreaming:
+            # Unprocessed memories below the consolidation threshold, without topping up from
+            # processed ones. This includes memories from before the watermark that earlier
+            # cycles left over (packing leftovers, skipped groups, memories without a group yet),
+            # as the watermark moves past them when a cycle ends.
+            memories_to_consolidate = [
+                m for m in self.memory_system.get_unprocessed_memories()
+                if m.get("importance", 0) <= self.consolidation_threshold
+            ]
+
+            # Also look for similar memory content in clusters the new memories touch
+            similar_memories = self.memory_system.find_similar_memories(since_revision=self.dream_watermark)
+        else:
+            # Get memories below the consolidation threshold
+            memories_to_consolidate = self.memory_system.get_memories_by_importance(
+                max_importance=self.consolidation_threshold,
+                min_count=3
+            )
+
+            # Also look for similar memory content
+            similar_memories = self.memory_system.find_similar_memories()
+
+        for group in similar_memories:
+            memories_to_consolidate.extend(group)
+
+        # Remove duplicates
+        unique_ids = set()
+        filtered_memories = []
+        for memory in memories_to_consolidate:
+            if memory.get("id") not in unique_ids:
+                filtered_memories.append(memory)
+                unique_ids.add(memory.get("id"))
+
+        memories_to_consolidate = filtered_memories
+        self._pace_stage_end(stage_start_time)
+
+        # Check optimization after memory selection
+        stage_data = {"memory_count": len(memories_to_consolidate)}
+        if not self._should_continue_dreaming(stage_data, stage="memory-selection"):
+            raise Exception("Dream cycle terminated early: Not enough valuable memories to consolidate")
+
+        return memories_to_consolidate
+
+    def _run_consolidation_stage(self, inputs):
+        """Stage 2: Consolidate the selected memories
+
+        Args:
+            inputs: Results of the stages this one depends on
+
+        Returns:
+            list: Consolidation records, or StageGraph.HALT to end the dream early
+        """
+        memories_to_consolidate = inputs["memory-selection"]
+
+        if not memories_to_consolidate:
+            self._update_dream_stage("memory-selection")
+            self.current_dream["stages"].append({
+                "description": "No memories found for consolidation",
+                "timestamp": time.time()
+            })
+            self._release_partials("partial_scenarios")
+            return []
+
+        self._update_dream_stage("consolidation")
+        print("Consolidation stage started")
+        stage_start_time = time.time()
+        self._pace_stage_start()
+
+        consolidated = self._consolidate_memories(memories_to_consolidate)
+        self.current_dream["consolidations"] = consolidated
+        self._pace_stage_end(stage_start_time)
+
+        # Check optimization after consolidation
+        stage_data = {"consolidations": consolidated}
+        if not self._should_continue_dreaming(stage_data, stage="consolidation"):
+            # End dream early but still save what we've done
+            print("Dream cycle ending early after consolidation due to optimization")
+            return StageGraph.HALT
+
+        self._release_partials("partial_scenarios")
+        return consolidated
+
+    def _run_hypothesis_stage(self, inputs):
+        """Stage 3: Generate hypothetical scenarios (runs alongside consolidation)
+
+        Args:
+            inputs: Results of the stages this one depends on
+
+        Returns:
+            list: Generated scenarios, not yet stored
+        """
+        self._update_dream_stage("hypothesis")
+        print("Hypothesis generation stage started")
+        stage_start_time = time.time()
+        self._pace_stage_start()
+
+        scenarios = self._generate_scenarios()
+        self._pace_stage_end(stage_start_time)
+
+        return scenarios
+
+    def _run_hypothesis_review_stage(self, inputs):
+        """Store the generated scenarios once consolidation has allowed the dream to continue
+
+        Args:
+            inputs: Results of the stages this one depends on
+
+        Returns:
+            list: Stored scenarios, or StageGraph.HALT to end the dream early
+        """
+        scenarios = inputs["hypothesis"]
+        self.current_dream["scenarios"] = scenarios
+
+        # Store the scenarios in hypothetical_scenarios, keeping only recent ones
+        with self.state_lock:
+            self.cancel_token.check()
+            self.hypothetical_scenarios = (self.hypothetical_scenarios + scenarios)[-15:]
+
+        # Check optimization after scenario generation
+        stage_data = {"scenarios": scenarios}
+        if not self._should_continue_dreaming(stage_data, stage="hypothesis"):
+            # End dream early but still save what we've done
+            print("Dream cycle ending early after scenario generation due to optimization")
+            return StageGraph.HALT
+
+        return scenarios
+
+    def _run_insight_stage(self, inputs):
+        """Stage 4: Generate insights from the scenarios and store the valuable ones
+
+        Args:
+            inputs: Results of the stages this one depends on
+
+        Returns:
+            list: Generated insights
+        """
+        scenarios = inputs["hypothesis-review"]
+        if not scenarios:
+            return []
+
+        self._update_dream_stage("insight")
+        print("Insight formation stage started")
+        stage_start_time = time.time()
+        self._pace_stage_start()
+
+        insights = self._generate_insights(scenarios)
+        self.current_dream["insights"] = insights
+
+        # Store valuable insights as new memories
+        for insight in insights:
+            if insight.get("value", 0) > 0.6:  # Only store valuable insights
+                # A reset may have cleared the memory store while the insights were generated
+                self.cancel_token.check()
+                self.memory_system.add_insight(
+                    insight["text"],
+                    importance=insight["value"],
+                    metadata={"dream_id": self.current_dream["id"]}
+                )
+        self._pace_stage_end(stage_start_time)
+
+        # Check optimization after insight generation
+        stage_data = {"insights": insights}
+        if not self._should_continue_dreaming(stage_data, stage="insight"):
+            print("Dream cycle completed all stages but optimization suggests no further benefit")
+
+        return insights
 
     def _finalize_dream(self, start_time, error=None):
         """Finalize the dream record and return summary
@@ -328,20 +893,39 @@ class DreamSystem:
         # Calculate duration
         cycle_duration = time.time() - start_time
         self.current_dream["duration"] = cycle_duration
+        if self.cycle_budget:
+            self.current_dream["tokens_used"] = self.cycle_budget.used_tokens
+
+        # Partial results streamed in during the cycle are superseded by the final ones
+        self.current_dream.pop("partial_scenarios", None)
+        self.current_dream.pop("partial_insights", None)
 
         # Add early termination info if applicable
         if error:
             self.current_dream["early_termination"] = True
             self.current_dream["termination_reason"] = error
 
-        # Save the dream record
-        self.dream_records.append(self.current_dream)
+        # Keep the checkpoint of a failed cycle that has work to resume, otherwise it is done.
+        # A cycle that keeps failing (e.g. on a bad stage input) is given up after
+        # max_resume_attempts runs rather than resumed into the same failure forever.
+        attempts = self.checkpoint.get("attempts", 1) if self.checkpoint else 0
+        if error and attempts >= self.max_resume_attempts:
+            print(f"Discarding dream checkpoint after {attempts} failed attempts")
+            self._clear_checkpoint()
+        elif not (error and self._checkpoint_has_work()):
+            self._clear_checkpoint()
+
+        # Archive the dream record - this replaces the record of an earlier attempt at a
+        # resumed cycle - and keep only recent dream records in memory
+        self.archive.save(self.current_dream)
+        with self.state_lock:
+            dream_records = [r for r in self.dream_records if r["id"] != self.current_dream["id"]]
+            self.dream_records = (dream_records + [self.current_dream])[-10:]
+            self.last_dream_time = time.time()
+            self.records_version = next(self._versions)
+        self._state_changed()
         print(f"Dream cycle completed in {cycle_duration:.2f} seconds")
 
-        # Keep only recent dream records in memory
-        if len(self.dream_records) > 10:
-            self.dream_records = self.dream_records[-10:]
-
         # Return summary of the dream cycle
         result = {
             "dream_id": self.current_dream["id"],
@@ -367,6 +951,7 @@ class DreamSystem:
                 "description": stage_description,
                 "timestamp": time.time()
             })
+        self._state_changed()
 
     def _consolidate_memories(self, memories):
         """Consolidate similar low-importance memories
@@ -377,7 +962,9 @@ class DreamSystem:
         Returns:
             list: List of consolidation records
         """
-        consolidations = []
+        # Continue from consolidations completed before a checkpoint
+        consolidations = self.current_dream["consolidations"]
+        completed_groups = set(self.checkpoint["completed_groups"]) if self.checkpoint else set()
 
         # Group memories by similarity
         # First, group memories that have the same similar_to metadata value
@@ -409,9 +996,24 @@ class DreamSystem:
             if len(memory_group) < 2:
                 continue  # Need at least 2 memories to consolidate
 
+            if str(key) in completed_groups:
+                continue  # Consolidated before the checkpoint
+
+            # Stop between groups once the cycle is cancelled
+            self.cancel_token.check()
+
             try:
+                # Pack as many of the group's memories as fit the prompt budget - the rest stay
+                # unprocessed for a later cycle
+                memory_group, memory_texts, _ = pack_memories(
+                    memory_group,
+                    self.prompt_token_budgets["consolidation"],
+                    max_item_tokens=self.max_memory_prompt_tokens
+                )
+                if len(memory_group) < 2:
+                    continue
+
                 # Use OpenAI to generate a consolidation
-                memory_texts = [f"- {m['text']}" for m in memory_group[:5]]
                 prompt = f"""
                 Consolidate these similar memories into a single concise memory that captures their essence:
 
@@ -422,23 +1024,40 @@ class DreamSystem:
 
                 Return only the consolidated memory text, no explanations.
                 """
-
                 if not self.client:
                     print("OpenAI client not available, using simple consolidation")
                     consolidated_text = f"Combined memory from {len(memory_group)} similar events: {memory_group[0]['text']}"
+                    prompt_tokens = 0  # No call was made
                 else:
+                    expected_value = self.planner.consolidation_value(
+                        memory_group, self.memory_system.get_consolidated_memories(), self.dream_records
+                    )
+                    if not self._plan_call("consolidation", expected_value, prompt, max_tokens=150):
+                        continue
+                    prompt_tokens = self._record_prompt_tokens("consolidation", prompt)
+
                     print(f"Generating consolidated memory for {len(memory_group)} memories")
-                    response = self.client.chat.completions.create(
+                    response = self.llm.create(
+                        caller="dream",
+                        priority=BACKGROUND,
+                        budget=self.cycle_budget,
+                        cancel_token=self.cancel_token,
+                        timeout=self.llm_call_timeout,
                         model="gpt-3.5-turbo",
                         messages=[
                             {"role": "system", "content": "You consolidate similar memories into a single memory that captures their essence, similar to how human memory works during sleep."},
                             {"role": "user", "content": prompt}
                         ],
                         max_tokens=150,
-                        temperature=0.3
+                        temperature=0.3,
+                        coalesce=True
                     )
 
                     consolidated_text = response.choices[0].message.content.strip()
+                    self._record_yield("consolidation", self.planner.consolidation_yield(
+                        consolidated_text, memory_group, self.memory_system.get_consolidated_memories()))
+                    if not consolidated_text:
+                        continue
 
                 # Calculate average importance and create the consolidated memory
                 avg_importance = sum(m.get("importance", 0.2) for m in memory_group) / len(memory_group)
@@ -459,7 +1078,8 @@ class DreamSystem:
                 if len(event_types) == 1:
                     consolidated_metadata["event_type"] = list(event_types)[0]
 
-                # Store the consolidated memory
+                # Store the consolidated memory, unless a reset cancelled the cycle during the call
+                self.cancel_token.check()
                 self.memory_system.add_consolidated_memory(
                     consolidated_text,
                     importance=min(avg_importance * 1.2, 0.8),  # Give a slight boost but cap it
@@ -468,6 +1088,7 @@ class DreamSystem:
 
                 # Mark original memories as processed
                 memory_ids = [m.get("id") for m in memory_group]
+                self.cancel_token.check()
                 self.memory_system.mark_memories_processed(memory_ids)
 
                 # Record the consolidation
@@ -475,13 +1096,27 @@ class DreamSystem:
                     "original_memories": [m["text"] for m in memory_group],
                     "consolidated_text": consolidated_text,
                     "source": memory_group[0].get("source", "unknown"),
-                    "count": len(memory_group)
+                    "count": len(memory_group),
+                    "prompt_tokens": prompt_tokens
                 })
 
+                # Checkpoint the group so a resumed cycle does not consolidate it again
+                if self.checkpoint is not None:
+                    with self.checkpoint_lock:
+                        self.checkpoint["completed_groups"].append(str(key))
+                    self._save_checkpoint()
+
                 print(f"Successfully consolidated {len(memory_group)} memories")
 
+            except BudgetExhausted as e:
+                print(f"Stopping consolidation: {e}")
+                break
+            except Cancelled:
+                raise
             except Exception as e:
                 print(f"Error consolidating memories: {e}")
+                if self.client:
+                    self._record_yield("consolidation", 0.0)
 
         return consolidations
 
@@ -511,8 +1146,12 @@ class DreamSystem:
             return scenarios
 
         try:
-            # Format memories for the prompt
-            memory_texts = [f"- {m['text']}" for m in context_memories[:5]]
+            # Pack the most important memories per token into the prompt budget
+            context_memories, memory_texts, _ = pack_memories(
+                context_memories,
+                self.prompt_token_budgets["hypothesis"],
+                max_item_tokens=self.max_memory_prompt_tokens
+            )
 
             prompt = f"""
             Based on these memories, generate 2-3 hypothetical scenarios that could occur in the future.
@@ -528,7 +1167,6 @@ class DreamSystem:
 
             Return a JSON array of scenario objects.
             """
-
             if not self.client:
                 print("OpenAI client not available, using simple scenarios")
                 # Create a simple scenario as fallback
@@ -540,48 +1178,36 @@ class DreamSystem:
                     "id": str(time.time()) + "_" + str(random.randint(1000, 9999))
                 }]
             else:
+                expected_value = self.planner.scenario_value(
+                    context_memories, self.hypothetical_scenarios, self.dream_records
+                )
+                if not self._plan_call("hypothesis", expected_value, prompt, max_tokens=500):
+                    return scenarios
+                self._record_prompt_tokens("hypothesis", prompt)
+
                 print("Generating hypothetical scenarios")
-                response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
+                scenarios = self._request_json_array(
                     messages=[
                         {"role": "system", "content": "You generate hypothetical scenarios based on provided memories."},
                         {"role": "user", "content": prompt}
                     ],
                     max_tokens=500,
-                    temperature=0.7
+                    temperature=0.7,
+                    partial_key="partial_scenarios"
                 )
-
-                # Extract JSON from response
-                content = response.choices[0].message.content.strip()
-
-                # Handle various JSON formats that might be returned
-                if "```json" in content:
-                    json_str = content.split("```json")[1].split("```")[0].strip()
-                elif "```" in content:
-                    json_str = content.split("```")[1].strip()
-                else:
-                    json_str = content
-
-                generated_scenarios = json.loads(json_str)
-
-                # Process and enhance each scenario
-                for scenario in generated_scenarios:
-                    # Add timestamp and ID
-                    scenario["timestamp"] = time.time()
-                    scenario["id"] = str(time.time()) + "_" + str(random.randint(1000, 9999))
-                    scenarios.append(scenario)
-
-            # Store the scenarios in hypothetical_scenarios
-            self.hypothetical_scenarios.extend(scenarios)
-
-            # Keep only recent scenarios in memory
-            if len(self.hypothetical_scenarios) > 15:
-                self.hypothetical_scenarios = self.hypothetical_scenarios[-15:]
+                self._record_yield("hypothesis", self._calculate_optimization_value(
+                    {"scenarios": scenarios}, stage="hypothesis"))
 
             print(f"Generated {len(scenarios)} hypothetical scenarios")
 
+        except BudgetExhausted as e:
+            print(f"Skipping scenario generation: {e}")
+        except Cancelled:
+            raise
         except Exception as e:
             print(f"Error generating scenarios: {e}")
+            if self.client:
+                self._record_yield("hypothesis", 0.0)
 
         return scenarios
 
@@ -619,7 +1245,6 @@ class DreamSystem:
 
             Return a JSON array of insight objects.
             """
-
             if not self.client:
                 print("OpenAI client not available, using simple insight")
                 # Create a simple insight as fallback
@@ -631,81 +1256,333 @@ class DreamSystem:
                     "id": str(time.time()) + "_" + str(random.randint(1000, 9999))
                 }]
             else:
+                expected_value = self.planner.insight_value(scenarios, self.dream_records)
+                if not self._plan_call("insight", expected_value, prompt, max_tokens=350):
+                    return insights
+                self._record_prompt_tokens("insight", prompt)
+
                 print("Generating insights from scenarios")
-                response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
+                insights = self._request_json_array(
                     messages=[
                         {"role": "system", "content": "You generate valuable insights from hypothetical scenarios."},
                         {"role": "user", "content": prompt}
                     ],
                     max_tokens=350,
-                    temperature=0.5
+                    temperature=0.5,
+                    partial_key="partial_insights"
                 )
+                self._record_yield("insight", self._calculate_optimization_value(
+                    {"insights": insights}, stage="insight"))
 
-                # Extract JSON from response
-                content = response.choices[0].message.content.strip()
+            # Store the insights, keeping only recent ones
+            with self.state_lock:
+                self.dream_insights = (self.dream_insights + insights)[-15:]
 
-                # Handle various JSON formats that might be returned
-                if "```json" in content:
-                    json_str = content.split("```json")[1].split("```")[0].strip()
-                elif "```" in content:
-                    json_str = content.split("```")[1].strip()
-                else:
-                    json_str = content
+            print(f"Generated {len(insights)} insights")
 
-                generated_insights = json.loads(json_str)
+        except BudgetExhausted as e:
+            print(f"Skipping insight generation: {e}")
+        except Cancelled:
+            raise
+        except Exception as e:
+            print(f"Error generating insights: {e}")
+            if self.client:
+                self._record_yield("insight", 0.0)
 
-                # Process each insight
-                for insight in generated_insights:
-                    # Add timestamp and ID
-                    insight["timestamp"] = time.time()
-                    insight["id"] = str(time.time()) + "_" + str(random.randint(1000, 9999))
-                    insights.append(insight)
+        return insights
 
-            # Store the insights
-            self.dream_insights.extend(insights)
+    def _request_json_array(self, messages, max_tokens, temperature, partial_key):
+        """Request a JSON array of objects from the LLM and stamp each object with a timestamp and ID
 
-            # Keep only recent insights in memory
-            if len(self.dream_insights) > 15:
-                self.dream_insights = self.dream_insights[-15:]
+        In streaming mode each object is parsed as soon as it closes and appended to
+        current_dream[partial_key], so progress is visible before the completion finishes.
+        Objects under a key that is held back are published when it is released.
 
-            print(f"Generated {len(insights)} insights")
+        Args:
+            messages: Chat messages for the request
+            max_tokens: Completion token limit
+            temperature: Sampling temperature
+            partial_key: current_dream key partial results are pushed to while streaming
 
-        except Exception as e:
-            print(f"Error generating insights: {e}")
+        Returns:
+            list: The generated objects
+        """
+        request = {
+            "caller": "dream",
+            "priority": BACKGROUND,
+            "budget": self.cycle_budget,
+            "cancel_token": self.cancel_token,
+            "timeout": self.llm_call_timeout,
+            "model": "gpt-3.5-turbo",
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
 
-        return insights
+        if not self.streaming_enabled:
+            response = self.llm.create(**request)
+            content = response.choices[0].message.content.strip()
+            generated = json.loads(self._extract_json(content))
+            for item in generated:
+                self._stamp_generated(item)
+            return generated
+
+        parser = JsonArrayStream()
+        generated = []
+        for text in self.llm.stream(**request):
+            for item in parser.feed(text):
+                self._stamp_generated(item)
+                generated.append(item)
+                self._publish_partial(partial_key, item)
+
+        # Fall back to parsing the whole completion if no objects could be streamed out
+        if not generated:
+            generated = json.loads(self._extract_json(parser.text.strip()))
+            for item in generated:
+                self._stamp_generated(item)
+
+        return generated
+
+    def _publish_partial(self, partial_key, item):
+        """Show a streamed object in current_dream, or hold it while its key is held back
+
+        Args:
+            partial_key: current_dream key for the partial results
+            item: Streamed scenario or insight
+        """
+        with self.partial_lock:
+            held = self.held_partials.get(partial_key)
+            if held is not None:
+                held.append(item)
+                return
+            if self.current_dream is None:
+                return
+            self.current_dream.setdefault(partial_key, []).append(item)
+        self._state_changed()
+
+    def _release_partials(self, partial_key):
+        """Publish the objects held back under partial_key and stop holding new ones
+
+        Args:
+            partial_key: current_dream key for the partial results
+        """
+        with self.partial_lock:
+            held = self.held_partials.get(partial_key)
+            self.held_partials[partial_key] = None
+            if not held or self.current_dream is None:
+                return
+            self.current_dream.setdefault(partial_key, []).extend(held)
+        self._state_changed()
+
+    def _plan_call(self, stage, expected_value, prompt, max_tokens):
+        """Ask the planner whether an LLM call is worth its tokens and record the decision
+
+        Args:
+            stage: Dream stage making the call
+            expected_value: Planner's expected value for the call (0-1)
+            prompt: The prompt text
+            max_tokens: Completion token limit of the call
+
+        Returns:
+            bool: Whether to make the call
+        """
+        if not self.planning_enabled:
+            return True
+
+        estimated_tokens = estimate_tokens(prompt) + max_tokens
+        approved = self.planner.should_call(expected_value, estimated_tokens)
+
+        if self.current_dream is not None:
+            plan = self.current_dream.setdefault("planner", {"approved": 0, "skipped": []})
+            if approved:
+                plan["approved"] += 1
+            else:
+                plan["skipped"].append({
+                    "stage": stage,
+                    "expected_value": expected_value,
+                    "estimated_tokens": estimated_tokens
+                })
+
+        if not approved:
+            print(f"Skipping {stage} call: expected value {expected_value:.2f} too low for ~{estimated_tokens} tokens")
+
+        return approved
+
+    def _record_yield(self, stage, value):
+        """Record the value an LLM call produced, for the planner's historical yield
+
+        Args:
+            stage: Dream stage that made the call
+            value: Value the call produced (0-1)
+        """
+        if self.current_dream is None:
+            return
+
+        stage_yield = self.current_dream.setdefault("llm_yield", {}).setdefault(stage, {"calls": 0, "value": 0.0})
+        stage_yield["calls"] += 1
+        stage_yield["value"] += value
+
+    def _record_prompt_tokens(self, stage, prompt):
+        """Record the estimated prompt size of a call in the current dream
+
+        Only called for calls that are issued, so skipped calls are not counted as spent.
+
+        Args:
+            stage: Dream stage making the call
+            prompt: The prompt text
+
+        Returns:
+            int: Estimated prompt tokens
+        """
+        prompt_tokens = estimate_tokens(prompt)
+        print(f"{stage} prompt uses ~{prompt_tokens} tokens")
+        if self.current_dream is not None:
+            self.current_dream.setdefault("prompt_tokens", []).append({
+                "stage": stage,
+                "tokens": prompt_tokens
+            })
+        return prompt_tokens
+
+    def _extract_json(self, content):
+        """Extract the JSON part of an LLM response
+
+        Args:
+            content: Response text
+
+        Returns:
+            str: The JSON text
+        """
+        # Handle various JSON formats that might be returned
+        if "```json" in content:
+            return content.split("```json")[1].split("```")[0].strip()
+        elif "```" in content:
+            return content.split("```")[1].strip()
+        return content
+
+    def _stamp_generated(self, item):
+        """Add a timestamp and ID to a generated scenario or insight"""
+        item["timestamp"] = time.time()
+        item["id"] = str(time.time()) + "_" + str(random.randint(1000, 9999))
+
+    def _state_changed(self):
+        """Mark the state shown by get_state as changed so its snapshot is rebuilt"""
+        self.state_version = next(self._versions)
 
     def get_state(self):
         """Get the current state of the dream system for display in UI
 
+        The state is served from a snapshot cached until the dream or memory state
+        changes, so it must not be modified.
+
         Returns:
             dict: Current dream system state
         """
+        return self.state_snapshot.get(self._state_key())
+
+    def get_state_json(self):
+        """Get the cached UI state serialized as JSON
+
+        Returns:
+            bytes: UTF-8 JSON of get_state()
+        """
+        return self.state_snapshot.get_json(self._state_key())
+
+    def _state_key(self):
+        """Version key of the UI state - it also shows memory counts, so includes the memory version"""
+        return self.state_version, self.memory_system.version
+
+    def _build_state(self):
+        """Build the UI state snapshot"""
         return {
             "dreaming": self.dreaming,
             "current_stage": self.current_stage,
             "last_dream_time": self.last_dream_time,
-            "current_dream": self.current_dream,
+            "auto_dreaming_enabled": self.auto_dreaming_enabled,
+            "current_dream": self._snapshot_dream(),
             "consolidated_count": len(self.memory_system.get_consolidated_memories()),
             "scenarios_count": len(self.hypothetical_scenarios),
             "insights_count": len(self.memory_system.get_insights())
         }
 
-    def get_recent_dreams(self):
-        """Get recent dream records for display
+    def _snapshot_dream(self):
+        """Copy the dream in progress so it can be serialized while stages keep updating it
+
+        Stages only ever add keys and append to the dream's lists and dicts, so copying
+        the top level and each container (each copy is atomic under the GIL) gives a
+        consistent view without holding up the stages.
+
+        Returns:
+            dict: Copy of the current dream, or None if not dreaming
+        """
+        current_dream = self.current_dream
+        if current_dream is None:
+            return None
+
+        snapshot = {}
+        for key, value in dict(current_dream).items():
+            if isinstance(value, list):
+                value = list(value)
+            elif isinstance(value, dict):
+                value = {k: list(v) if isinstance(v, list) else v for k, v in dict(value).items()}
+            snapshot[key] = value
+        return snapshot
+
+    def get_recent_dreams(self, limit=10, cursor=None, since=None, until=None, early_termination=None,
+                          summary=True):
+        """Get archived dream records for display, newest first
+
+        Args:
+            limit: Maximum number of records to return
+            cursor: next_cursor from a previous page, to continue after it
+            since: Only dreams started at or after this Unix time
+            until: Only dreams started before this Unix time
+            early_termination: Only dreams that did (True) or did not (False) end early
+            summary: Return summaries without the heavy fields instead of full records
+
+        Returns:
+            dict: {"dreams": records, "next_cursor": cursor for the next page or None}
+        """
+        dreams, next_cursor = self.archive.list(limit=limit, cursor=cursor, since=since, until=until,
+                                                early_termination=early_termination, summary=summary)
+        return {"dreams": dreams, "next_cursor": next_cursor}
+
+    def get_recent_dreams_json(self):
+        """Get the first page of dream summaries serialized as JSON, cached until the archive changes
 
         Returns:
-            list: Recent dream records
+            bytes: UTF-8 JSON of get_recent_dreams()
         """
-        return self.dream_records
+        return self.records_snapshot.get_json(self.records_version)
+
+    def get_dream(self, dream_id):
+        """Get the full archived record of a dream
+
+        Args:
+            dream_id: Dream id
+
+        Returns:
+            dict: The dream record, or None if it is not archived
+        """
+        return self.archive.get(dream_id)
 
     def reset(self):
-        """Reset the dream system state"""
-        self.current_dream = None
-        self.dream_records = []
-        self.hypothetical_scenarios = []
-        self.dream_insights = []
-        self.current_stage = "idle"
-        self.dreaming = False
-        self.last_dream_time = 0
\ No newline at end of file
+        """Reset the dream system state
+
+        A cycle in progress is cancelled rather than waited for.
+        """
+        # Set before cancelling, so the cycle sees it however soon it catches the cancellation
+        self.discard_cancelled_cycle = True  # The cancelled cycle must not record its results
+        self.cancel_dream_cycle("Dream system reset")
+        with self.state_lock:
+            # A cancelled cycle clears dreaming, current_dream and current_stage itself on exit
+            self.dream_records = []
+            self.hypothetical_scenarios = []
+            self.dream_insights = []
+            self.last_dream_time = 0
+            self.archive.clear()
+            self.records_version = next(self._versions)
+        self._state_changed()
+        self.dream_watermark = 0
+        self.auto_dream_armed = True
+        self.auto_dream_backoff = 1
+        self._clear_checkpoint()
\ No newline at end of file
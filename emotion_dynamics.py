@@ -0,0 +1,211 @@
+from collections.abc import MutableMapping
+
+import numpy as np
+
+# Emotion dimensions, in the order of the state vector
+EMOTIONS = ("joy", "sadness", "anger", "fear", "surprise", "trust", "disgust", "anticipation")
+EMOTION_INDEX = {emotion: i for i, emotion in enumerate(EMOTIONS)}
+
+
+def apply_decay(state, elapsed_time, decay_rate, rng):
+    """Decay emotions toward 0 in place, more intense emotions decaying more slowly
+
+    Works on a single state vector or a matrix with one agent per row.
+
+    Args:
+        state: Emotion intensities (..., len(EMOTIONS))
+        elapsed_time: Seconds of decay to apply
+        decay_rate: Fraction of intensity kept per second (scalar or per-row column)
+        rng: numpy.random.Generator for the ±5% variation
+    """
+    decay_factor = np.power(decay_rate, elapsed_time)
+    intensity_factor = 0.2 + state * 0.8
+    variation = 1.0 + rng.uniform(-0.05, 0.05, state.shape)
+    state *= np.power(decay_factor, intensity_factor) * variation
+
+
+def apply_noise(state, noise_magnitude, rng):
+    """Add random noise in place, smaller for more intense emotions
+
+    Args:
+        state: Emotion intensities (..., len(EMOTIONS))
+        noise_magnitude: Base noise scale (scalar or per-row column)
+        rng: numpy.random.Generator
+    """
+    base_noise = noise_magnitude * (1.0 - state * 0.7)
+    noise_scale = base_noise * rng.uniform(0.5, 1.5, state.shape)
+    state += rng.uniform(-1.0, 1.0, state.shape) * noise_scale
+    np.clip(state, 0.0, 1.0, out=state)
+
+
+def apply_micro_fluctuations(state, rng):
+    """Nudge 2-3 random emotions per state in place, emotions far from neutral moving less
+
+    Args:
+        state: Emotion intensities (..., len(EMOTIONS))
+        rng: numpy.random.Generator
+    """
+    # Rank the emotions randomly and adjust the first 2 or 3 of each state
+    ranks = rng.random(state.shape).argsort(axis=-1).argsort(axis=-1)
+    counts = rng.integers(2, 4, size=state.shape[:-1] + (1,))
+    selected = ranks < counts
+
+    micro_change = rng.uniform(-0.03, 0.03, state.shape)
+    distance_from_mid = np.abs(state - 0.5)
+    micro_change = np.where(distance_from_mid > 0.3, micro_change * (1.0 - distance_from_mid), micro_change)
+
+    state += np.where(selected, micro_change, 0.0)
+    np.clip(state, 0.0, 1.0, out=state)
+
+
+def decay_closed_form(state, elapsed_time, decay_rate):
+    """Decay emotions over any elapsed time in closed form
+
+    The tick-by-tick decay above is the ODE dE/dt = -k E (a + b E) with k = -ln(decay_rate),
+    a = 0.2 and b = 0.8, whose solution is
+    E(t) = a E0 exp(-a k t) / (a + b E0 (1 - exp(-a k t))).
+
+    Args:
+        state: Emotion intensities at the start (..., len(EMOTIONS))
+        elapsed_time: Seconds elapsed (scalar, or an array broadcasting against state)
+        decay_rate: Fraction of intensity kept per second
+
+    Returns:
+        numpy.ndarray: Emotion intensities after elapsed_time
+    """
+    a, b = 0.2, 0.8
+    k = -np.log(decay_rate)
+    decay = np.exp(-a * k * np.asarray(elapsed_time))
+    return a * state * decay / (a + b * state * (1.0 - decay))
+
+
+def apply_fluctuation(state, slow_noise, fast_noise, noise_amplitude, micro_amplitude):
+    """Add noise and micro-fluctuations to emotion intensities, the way the tick dynamics scale them
+
+    Args:
+        state: Emotion intensities (..., len(EMOTIONS))
+        slow_noise: Noise values in -1..1 shaped like state
+        fast_noise: Micro-fluctuation values in -1..1 shaped like state
+        noise_amplitude: Largest noise offset
+        micro_amplitude: Largest micro-fluctuation offset
+
+    Returns:
+        numpy.ndarray: Fluctuating emotion intensities, clipped to 0-1
+    """
+    distance_from_mid = np.abs(state - 0.5)
+    micro_scale = np.where(distance_from_mid > 0.3, 1.0 - distance_from_mid, 1.0)
+    fluctuation = (noise_amplitude * (1.0 - state * 0.7) * slow_noise +
+                   micro_amplitude * micro_scale * fast_noise)
+    return np.clip(state + fluctuation, 0.0, 1.0)
+
+
+class NoiseProcess:
+    def __init__(self, rng, shape=(len(EMOTIONS),), components=3, min_period=2.0, max_period=20.0):
+        """Deterministic noise that can be evaluated at any time
+
+        Each value is a weighted sum of sinusoids with random periods and phases drawn
+        once from rng, so the same seed always gives the same noise and reading it at
+        an arbitrary timestamp needs no stepping.
+
+        Args:
+            rng: numpy.random.Generator the process parameters are drawn from
+            shape: Shape of each noise value, e.g. (len(EMOTIONS),) or (agents, len(EMOTIONS))
+            components: Sinusoids per value
+            min_period: Shortest sinusoid period (seconds)
+            max_period: Longest sinusoid period (seconds)
+        """
+        shape = tuple(shape) + (components,)
+        self.frequencies = 2 * np.pi / rng.uniform(min_period, max_period, shape)
+        self.phases = rng.uniform(0, 2 * np.pi, shape)
+        weights = rng.uniform(0.5, 1.0, shape)
+        self.weights = weights / weights.sum(axis=-1, keepdims=True)
+
+    def value(self, t):
+        """Evaluate the noise
+
+        Args:
+            t: Time in seconds (scalar or array of times)
+
+        Returns:
+            numpy.ndarray: Noise in -1..1, shaped t.shape + shape
+        """
+        t = np.asarray(t, dtype=float)[..., None, None]
+        return (self.weights * np.sin(self.frequencies * t + self.phases)).sum(axis=-1)
+
+
+def impact_vector(impact, min_change=0.0):
+    """Convert a dict of emotion changes to a vector, ignoring unknown emotions and small changes
+
+    Args:
+        impact: Dict of emotion name to change
+        min_change: Changes this small or smaller are dropped
+
+    Returns:
+        numpy.ndarray: Change per emotion
+    """
+    delta = np.zeros(len(EMOTIONS))
+    for emotion, change in impact.items():
+        index = EMOTION_INDEX.get(emotion)
+        if index is not None and abs(change) > min_change:
+            delta[index] = change
+    return delta
+
+
+class EmotionView(MutableMapping):
+    def __init__(self, state, lock, sync=None):
+        """Dict-style view of an emotion state vector
+
+        Reads and writes go straight to the vector, so code written against the old
+        emotion dict keeps working.
+
+        Args:
+            state: Emotion state vector, in EMOTIONS order
+            lock: Lock writers hold while changing the vector
+            sync: Optional callable that brings a lazily evaluated state up to date and
+                returns the vector readers should see
+        """
+        self._state = state
+        self._lock = lock
+        self._sync = sync
+
+    def _current(self):
+        """The vector readers see"""
+        return self._sync() if self._sync else self._state
+
+    def __getitem__(self, emotion):
+        return float(self._current()[EMOTION_INDEX[emotion]])
+
+    def __setitem__(self, emotion, value):
+        with self._lock:
+            if self._sync:
+                self._sync()
+            self._state[EMOTION_INDEX[emotion]] = value
+
+    def __delitem__(self, emotion):
+        raise TypeError("Emotion dimensions cannot be removed")
+
+    def __iter__(self):
+        return iter(EMOTIONS)
+
+    def __len__(self):
+        return len(EMOTIONS)
+
+    def __contains__(self, emotion):
+        return emotion in EMOTION_INDEX
+
+    def rebind(self, state, lock):
+        """Point the view at another state vector, e.g. a row of a shared matrix
+
+        Args:
+            state: Emotion state vector, in EMOTIONS order
+            lock: Lock writers hold while changing the vector
+        """
+        self._state = state
+        self._lock = lock
+
+    def copy(self):
+        """Copy the current emotions into a plain dict"""
+        return dict(zip(EMOTIONS, self._current().tolist()))
+
+    def __repr__(self):
+        return repr(self.copy())
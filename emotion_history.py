@@ -0,0 +1,192 @@
+import threading
+
+import numpy as np
+
+# Downsampled tiers as (interval in seconds, samples kept): 1s for an hour, 10s for 6 hours
+# and 1 minute for a day
+DEFAULT_TIERS = ((1.0, 3600), (10.0, 2160), (60.0, 1440))
+
+
+class RingBuffer:
+    def __init__(self, capacity, dims):
+        """Preallocated ring buffer of timestamped vectors with O(1) append
+
+        Args:
+            capacity: Number of samples kept
+            dims: Length of each sample vector
+        """
+        self.capacity = capacity
+        self.times = np.zeros(capacity)
+        self.values = np.zeros((capacity, dims))
+        self.head = 0  # Index the next sample is written to
+        self.count = 0
+
+    def append(self, t, value):
+        """Add a sample, overwriting the oldest once full"""
+        self.times[self.head] = t
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def extend(self, times, values):
+        """Add samples in order, keeping only the newest capacity of them"""
+        times, values = times[-self.capacity:], values[-self.capacity:]
+        indices = (self.head + np.arange(len(times))) % self.capacity
+        self.times[indices] = times
+        self.values[indices] = values
+        self.head = (self.head + len(times)) % self.capacity
+        self.count = min(self.count + len(times), self.capacity)
+
+    def since(self, start_time=None):
+        """Get the samples at or after start_time, oldest first
+
+        Args:
+            start_time: Earliest sample time to include (None for all)
+
+        Returns:
+            tuple: (times, values) arrays
+        """
+        order = (np.arange(self.count) + self.head - self.count) % self.capacity
+        times = self.times[order]
+        values = self.values[order]
+        if start_time is not None:
+            first = np.searchsorted(times, start_time)
+            times, values = times[first:], values[first:]
+        return times, values
+
+    def clear(self):
+        """Remove every sample"""
+        self.head = 0
+        self.count = 0
+
+
+class EmotionHistory:
+    def __init__(self, dims, base_interval=0.2, base_capacity=300, tiers=DEFAULT_TIERS):
+        """Fixed-memory, multi-resolution history of emotion state
+
+        Raw samples go into a ring buffer. Each tier averages the samples falling in each
+        of its intervals and keeps those averages in its own ring buffer, so long windows
+        are available at coarse resolution without growing memory.
+
+        Args:
+            dims: Number of emotion dimensions
+            base_interval: Interval between raw samples (seconds)
+            base_capacity: Raw samples kept
+            tiers: (interval, capacity) pairs for the downsampled tiers
+        """
+        self.dims = dims
+        self.resolutions = [base_interval] + [interval for interval, _ in tiers]
+        self.buffers = [RingBuffer(base_capacity, dims)] + [RingBuffer(capacity, dims) for _, capacity in tiers]
+        self._lock = threading.Lock()
+
+        # Running sum of the samples in each tier's current interval
+        self._bucket = [None] * len(tiers)
+        self._sums = np.zeros((len(tiers), dims))
+        self._counts = np.zeros(len(tiers))
+
+    def append(self, t, value):
+        """Record a sample, folding it into every tier
+
+        Args:
+            t: Sample time
+            value: Emotion vector
+        """
+        with self._lock:
+            self.buffers[0].append(t, value)
+
+            for tier, interval in enumerate(self.resolutions[1:]):
+                bucket = int(t // interval)
+                if bucket != self._bucket[tier]:
+                    # Close the previous interval with its average
+                    if self._counts[tier]:
+                        self.buffers[tier + 1].append(self._bucket[tier] * interval,
+                                                      self._sums[tier] / self._counts[tier])
+                    self._bucket[tier] = bucket
+                    self._sums[tier] = 0.0
+                    self._counts[tier] = 0
+                self._sums[tier] += value
+                self._counts[tier] += 1
+
+    def extend(self, times, values):
+        """Record many samples at once, in time order, without a Python loop per sample
+
+        Args:
+            times: Sample times, ascending
+            values: Emotion vectors, one row per sample
+        """
+        times = np.asarray(times, dtype=float)
+        values = np.asarray(values, dtype=float)
+        if not len(times):
+            return
+
+        with self._lock:
+            self.buffers[0].extend(times, values)
+
+            for tier, interval in enumerate(self.resolutions[1:]):
+                buckets = (times // interval).astype(np.int64)
+                unique_buckets, starts, counts = np.unique(buckets, return_index=True, return_counts=True)
+                sums = np.add.reduceat(values, starts, axis=0)
+
+                # Samples in the still-open interval join its running sum
+                if unique_buckets[0] == self._bucket[tier]:
+                    sums[0] += self._sums[tier]
+                    counts = counts.astype(float)
+                    counts[0] += self._counts[tier]
+                elif self._counts[tier]:
+                    self.buffers[tier + 1].append(self._bucket[tier] * interval,
+                                                  self._sums[tier] / self._counts[tier])
+
+                # Every interval but the last is complete
+                if len(unique_buckets) > 1:
+                    self.buffers[tier + 1].extend(unique_buckets[:-1] * interval,
+                                                  sums[:-1] / np.asarray(counts[:-1])[:, None])
+
+                self._bucket[tier] = int(unique_buckets[-1])
+                self._sums[tier] = sums[-1]
+                self._counts[tier] = counts[-1]
+
+    def get(self, window=None, resolution=None, now=None):
+        """Get the history over a time window
+
+        Args:
+            window: Seconds of history to return (None for everything at the resolution)
+            resolution: Seconds between samples. The finest tier at least this coarse is used.
+                If None, the finest tier that covers the window is used.
+            now: End of the window (defaults to the latest sample)
+
+        Returns:
+            tuple: (resolution used, times, values) - values has one row per sample
+        """
+        with self._lock:
+            tier = self._pick_tier(window, resolution)
+            buffer = self.buffers[tier]
+            if now is None:
+                now = buffer.times[(buffer.head - 1) % buffer.capacity] if buffer.count else 0.0
+            start_time = now - window if window is not None else None
+            times, values = buffer.since(start_time)
+            return self.resolutions[tier], times, values
+
+    def _pick_tier(self, window, resolution):
+        """Index of the tier to read for a window and resolution"""
+        if resolution is not None:
+            for tier, interval in enumerate(self.resolutions):
+                if interval >= resolution:
+                    return tier
+            return len(self.resolutions) - 1
+
+        if window is not None:
+            for tier, interval in enumerate(self.resolutions):
+                if interval * self.buffers[tier].capacity >= window:
+                    return tier
+            return len(self.resolutions) - 1
+
+        return 0
+
+    def clear(self):
+        """Remove all history"""
+        with self._lock:
+            for buffer in self.buffers:
+                buffer.clear()
+            self._bucket = [None] * len(self._bucket)
+            self._sums[:] = 0.0
+            self._counts[:] = 0
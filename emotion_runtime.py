@@ -0,0 +1,225 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from emotion_dynamics import EMOTIONS, apply_decay, apply_noise, apply_micro_fluctuations
+
+
+class EmotionRuntime:
+    def __init__(self, tick_interval=0.05, history_interval=0.2, micro_interval=0.5,
+                 thought_workers=8, request_workers=8, initial_capacity=64, seed=None):
+        """Shared scheduler hosting many EmotionalSystem agents in one process
+
+        Every agent's emotion vector is a row of one state matrix. A single scheduler
+        thread decays and perturbs all rows in one vectorized step per tick, records
+        history for all agents at once, and hands due thoughts to a shared worker pool.
+        Agents also run their chat-turn work (impact analysis, committing streamed turns) on
+        a shared request pool, so the number of threads does not grow with the number of agents.
+
+        Agents attach themselves by being created with runtime=... and detach on stop().
+
+        Args:
+            tick_interval: Seconds between scheduler steps
+            history_interval: Seconds between emotion history samples
+            micro_interval: Seconds between micro-fluctuations
+            thought_workers: Threads in the shared thought generation pool
+            request_workers: Threads in the shared pool for agents' chat-turn work
+            initial_capacity: Agent rows allocated up front (the matrix doubles when full)
+            seed: Optional seed for the random generator driving the batched dynamics
+        """
+        self.tick_interval = tick_interval
+        self.history_interval = history_interval
+        self.micro_interval = micro_interval
+        self.rng = np.random.default_rng(seed)
+
+        # Agents share this lock with the runtime, so an impact applied to a row can never
+        # be lost to a concurrent batch step
+        self.lock = threading.RLock()
+
+        # Rows 0..count-1 are in use, row i belonging to agents[i]
+        self.states = np.zeros((initial_capacity, len(EMOTIONS)))
+        self.decay_rates = np.ones(initial_capacity)
+        self.noise_magnitudes = np.zeros(initial_capacity)
+        self.next_thought_times = np.full(initial_capacity, np.inf)
+        self.agents = []
+        self.rows = {}  # id(agent) -> row
+
+        self.executor = ThreadPoolExecutor(max_workers=thought_workers, thread_name_prefix="emotion-thought")
+        # Separate from the thought pool, so chat turns never queue behind background thoughts
+        self.request_executor = ThreadPoolExecutor(max_workers=request_workers, thread_name_prefix="emotion-request")
+        self.stats = {
+            "steps": 0,
+            "thoughts_started": 0,
+            "thoughts_skipped": 0,
+            "last_step_time": 0.0
+        }
+
+        now = time.time()
+        self.last_step_time = now
+        self.last_history_time = now
+        self.last_micro_time = now
+
+        self.running = True
+        self.scheduler_thread = threading.Thread(target=self._run, name="emotion-runtime")
+        self.scheduler_thread.daemon = True
+        self.scheduler_thread.start()
+
+    @property
+    def count(self):
+        """Number of registered agents"""
+        return len(self.agents)
+
+    def register(self, agent):
+        """Add an agent, moving its emotion state into the shared matrix
+
+        Args:
+            agent: EmotionalSystem to advance from now on
+        """
+        with self.lock:
+            if id(agent) in self.rows:
+                return
+            row = len(self.agents)
+            if row == len(self.states):
+                self._grow()
+
+            self.states[row] = agent.emotion_state
+            self.decay_rates[row] = agent.decay_rate
+            self.noise_magnitudes[row] = agent.noise_magnitude
+            self.next_thought_times[row] = time.time() + self._thought_delay(agent)
+            self.agents.append(agent)
+            self.rows[id(agent)] = row
+            agent._bind_state(self.states[row], self.lock)
+
+    def unregister(self, agent):
+        """Remove an agent, giving it back a private copy of its emotion state
+
+        The last row is moved into the freed one, so the rows in use stay contiguous.
+
+        Args:
+            agent: Registered EmotionalSystem
+        """
+        with self.lock:
+            row = self.rows.pop(id(agent), None)
+            if row is None:
+                return
+            last = len(self.agents) - 1
+            agent._bind_state(self.states[row].copy(), threading.RLock())
+
+            if row != last:
+                self.states[row] = self.states[last]
+                self.decay_rates[row] = self.decay_rates[last]
+                self.noise_magnitudes[row] = self.noise_magnitudes[last]
+                self.next_thought_times[row] = self.next_thought_times[last]
+                moved = self.agents[last]
+                self.agents[row] = moved
+                self.rows[id(moved)] = row
+                moved._bind_state(self.states[row], self.lock)
+            self.agents.pop()
+            self.next_thought_times[last] = np.inf
+
+    def update_parameters(self, agent):
+        """Pick up changes to an agent's decay_rate or noise_magnitude
+
+        Args:
+            agent: Registered EmotionalSystem
+        """
+        with self.lock:
+            row = self.rows.get(id(agent))
+            if row is not None:
+                self.decay_rates[row] = agent.decay_rate
+                self.noise_magnitudes[row] = agent.noise_magnitude
+
+    def _grow(self):
+        """Double the matrix capacity and point every agent at its row in the new matrix"""
+        capacity = len(self.states) * 2
+        count = len(self.agents)
+
+        states = np.zeros((capacity, len(EMOTIONS)))
+        states[:count] = self.states[:count]
+        self.states = states
+        self.decay_rates = np.concatenate([self.decay_rates, np.ones(capacity - len(self.decay_rates))])
+        self.noise_magnitudes = np.concatenate([self.noise_magnitudes,
+                                                np.zeros(capacity - len(self.noise_magnitudes))])
+        self.next_thought_times = np.concatenate([self.next_thought_times,
+                                                  np.full(capacity - len(self.next_thought_times), np.inf)])
+
+        for row, agent in enumerate(self.agents):
+            agent._bind_state(self.states[row], self.lock)
+
+    def _thought_delay(self, agent):
+        """Random delay before an agent's next thought"""
+        return self.rng.uniform(agent.thought_frequency * 0.5, agent.thought_frequency * 1.5)
+
+    def _run(self):
+        """Scheduler loop: step every agent each tick"""
+        while self.running:
+            started = time.time()
+            try:
+                self.step(started)
+            except Exception as e:
+                print(f"Error in emotion runtime step: {e}")
+            self.stats["last_step_time"] = time.time() - started
+            time.sleep(max(0.0, self.tick_interval - (time.time() - started)))
+
+    def step(self, now=None):
+        """Advance every agent's emotions to now and dispatch the thoughts that are due
+
+        Args:
+            now: Time to advance to (defaults to the current time)
+        """
+        now = time.time() if now is None else now
+        history = None
+        thoughts = []
+
+        with self.lock:
+            count = len(self.agents)
+            elapsed = max(0.0, now - self.last_step_time)
+            self.last_step_time = now
+            if not count:
+                return
+
+            # Decay, noise and micro-fluctuations for all agents, computed on a copy and
+            # written back in one array copy
+            state = self.states[:count].copy()
+            apply_decay(state, elapsed, self.decay_rates[:count, None], self.rng)
+            apply_noise(state, self.noise_magnitudes[:count, None], self.rng)
+            if now - self.last_micro_time > self.micro_interval:
+                apply_micro_fluctuations(state, self.rng)
+                self.last_micro_time = now
+            self.states[:count] = state
+
+            if now - self.last_history_time > self.history_interval:
+                history = (list(self.agents), state)
+                self.last_history_time = now
+
+            for row in np.flatnonzero(self.next_thought_times[:count] <= now):
+                agent = self.agents[row]
+                self.next_thought_times[row] = now + self._thought_delay(agent)
+                thoughts.append(agent)
+
+            self.stats["steps"] += 1
+
+        # History and thought dispatch happen outside the lock so agents are never held up
+        if history:
+            agents, states = history
+            for agent, row_state in zip(agents, states):
+                agent.emotion_history.append(now, row_state)
+                agent.last_update_time = now
+
+        # Agents drop a due thought while their previous one is still in flight
+        for agent in thoughts:
+            if agent._submit_thought(self.executor, now):
+                agent.last_thought_time = now
+                self.stats["thoughts_started"] += 1
+            else:
+                self.stats["thoughts_skipped"] += 1
+
+    def stop(self):
+        """Stop the scheduler and the shared pools. Registered agents are left in place."""
+        self.running = False
+        if self.scheduler_thread.is_alive():
+            self.scheduler_thread.join(timeout=1.0)
+        self.executor.shutdown(wait=False)
+        self.request_executor.shutdown(wait=False)
@@ -1,136 +1,314 @@
 import time
 import threading
-import random
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import numpy as np
+
+from emotion_history import EmotionHistory
+from emotion_lexicon import LexiconAnalyzer
+from emotion_dynamics import (EMOTIONS, EmotionView, NoiseProcess, apply_decay, apply_noise,
+                              apply_micro_fluctuations, apply_fluctuation, decay_closed_form, impact_vector)
+from llm_gateway import LLMGateway, INTERACTIVE, BACKGROUND
+
 
 class EmotionalSystem:
-    def __init__(self, client, memory_system):
+    def __init__(self, client, memory_system, llm_gateway=None, seed=None, event_driven=False, runtime=None,
+                 thought_window=None):
         """Initialize the emotional system
 
         Args:
             client: OpenAI client for emotion analysis
             memory_system: Reference to the MemorySystem for storing emotional memories
+            llm_gateway: Shared LLMGateway for rate limiting and retries. Created if not given.
+            seed: Optional seed for the random generator driving emotion dynamics and thought timing
+            event_driven: Run without a background tick loop. Decay is then computed in closed
+                form whenever the state is read or changed, noise comes from a deterministic
+                process evaluated at the read time, and thoughts are scheduled on a timer, so
+                an idle agent uses no CPU.
+            runtime: Optional EmotionRuntime to host this agent. The runtime's scheduler then
+                advances the emotions and its worker pool generates thoughts, and no thread
+                of the agent's own is started. Cannot be combined with event_driven.
+            thought_window: Only generate background thoughts for this many seconds after
+                the last message, and none before the first one. None thinks continuously.
         """
+        if runtime and event_driven:
+            raise ValueError("An agent hosted by a runtime cannot be event-driven")
+
         # OpenAI client
         self.client = client
+        self.llm = llm_gateway or LLMGateway(client)
         self.memory_system = memory_system
 
-        # Emotion dimensions with intensity 0-1 (0 = none, 1 = maximum)
-        self.emotions = {
-            "joy": 0.0,
-            "sadness": 0.0,
-            "anger": 0.0,
-            "fear": 0.0,
-            "surprise": 0.0,
-            "trust": 0.0,
-            "disgust": 0.0,
-            "anticipation": 0.0
-        }
-
-        # Track thoughts, conversation, and emotion history
-        self.thoughts = []
-        self.conversation = []
-        self.emotion_history = [self.emotions.copy()]
-        self.last_interaction = time.time()
+        # Thoughts, conversation and history are copy-on-write: changes are made to a copy
+        # under state_lock and published with a single assignment. Emotion updates are
+        # computed on a copy of the state vector and written back in one array copy. Readers
+        # such as get_state never see a half-applied update and need no lock.
+        self.state_lock = threading.RLock()
+        self.rng = np.random.default_rng(seed)
 
         # System parameters
         self.decay_rate = 0.95  # Emotion decay rate
         self.noise_magnitude = 0.015  # Random noise in emotions
         self.thought_frequency = 7  # Average seconds between thoughts
         self.update_frequency = 0.2  # How often to record emotion history
+        self.streaming_enabled = False  # Stream chat responses token by token
+        self.combined_thoughts = True  # Generate each thought and its impact in one call
+        self.max_impact = 0.2  # Largest change a thought can make to one emotion
+        self.impact_analysis = "local-first"  # "local", "llm", or "local-first" (LLM when unsure)
+        self.parallel_requests = True  # Analyze message impact while memories are retrieved
+        self.local_confidence_threshold = 0.5  # Lowest lexicon confidence accepted in local-first mode
+        self.lexicon = LexiconAnalyzer(max_impact=self.max_impact)
+        self.partial_response = None  # Response text streamed so far
+
+        # Emotion intensities 0-1 (0 = none, 1 = maximum) as a vector in EMOTIONS order,
+        # with a dict-style view for code that reads or sets emotions by name. In event-driven
+        # mode the vector holds the noise-free state as of state_time, and reads add decay
+        # since then plus noise.
+        self.event_driven = event_driven
+        self.emotion_state = np.zeros(len(EMOTIONS))
+        self.state_time = self.last_update_time = time.time()
+        if event_driven:
+            self.noise_amplitude = 0.05  # Largest noise offset
+            self.micro_amplitude = 0.03  # Largest micro-fluctuation offset
+            self.noise = NoiseProcess(self.rng, min_period=2.0, max_period=20.0)
+            self.micro_noise = NoiseProcess(self.rng, min_period=0.5, max_period=2.0)
+            self.emotions = EmotionView(self.emotion_state, self.state_lock, sync=self._sync_emotions)
+        else:
+            self.emotions = EmotionView(self.emotion_state, self.state_lock)
+
+        # Track thoughts, conversation, and emotion history
+        self.thoughts = []
+        self.conversation = []
+        self.emotion_history = EmotionHistory(len(EMOTIONS), base_interval=self.update_frequency)
+        self.emotion_history.append(time.time(), list(self.emotions.copy().values()))
+        self.last_interaction = time.time()
+        self.thought_window = thought_window
+        self.interacted = False  # Whether any message has arrived, for thought_window
 
         # Start background processing
         self.running = True
         self.last_thought_time = time.time()
-        self.last_update_time = time.time()
         self.last_micro_time = time.time()
-        self.background_thread = threading.Thread(target=self._background_process)
-        self.background_thread.daemon = True
-        self.background_thread.start()
+        self.background_thread = None
+        self.thought_timer = None
+        self.thought_executor = None
+        if runtime:
+            # Hosted agents share the runtime's pool instead of holding threads of their own
+            self.request_executor = runtime.request_executor
+        else:
+            self.request_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="emotion-request")
+        self.thought_in_flight = False  # Thoughts due while one is being generated are dropped
+        self.thoughts_dropped = 0
+        self.thought_stats = {
+            "combined": 0,  # Thoughts generated with their impact in one call
+            "impact_fallbacks": 0,  # Combined responses whose impact had to be analyzed separately
+            "fallbacks": 0  # Combined calls that failed, replaced by the two-call path
+        }
+        self.analysis_stats = {
+            "local": 0,  # Impacts taken from the lexicon
+            "llm": 0  # Impacts analyzed by the LLM
+        }
+        self.runtime = runtime
+        if runtime:
+            runtime.register(self)
+        elif event_driven:
+            if thought_window is None:
+                self._schedule_thought()
+        else:
+            # Thoughts wait on the network, so they run off the tick loop
+            self.thought_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="emotion-thought")
+            self.background_thread = threading.Thread(target=self._background_process)
+            self.background_thread.daemon = True
+            self.background_thread.start()
 
     def _background_process(self):
         """Run continuous background processing of emotions and thoughts"""
         while self.running:
             current_time = time.time()
 
-            # Apply natural decay
-            self._apply_decay(current_time - self.last_update_time)
-
-            # Apply random noise to emotions
-            self._apply_noise()
-
-            # Apply micro-fluctuations for more natural movement
-            if current_time - self.last_micro_time > 0.5:  # Every half second
-                self._apply_micro_fluctuations()
+            # Apply natural decay and random noise, plus micro-fluctuations every half second
+            # for more natural movement, as one vectorized update
+            micro_due = current_time - self.last_micro_time > 0.5
+            self._step_emotions(current_time - self.last_update_time, micro_due)
+            if micro_due:
                 self.last_micro_time = current_time
 
             # Generate periodic thoughts
             elapsed = current_time - self.last_thought_time
-            thought_due = elapsed > random.uniform(
+            thought_due = elapsed > self.rng.uniform(
                 self.thought_frequency * 0.5,
                 self.thought_frequency * 1.5
             )
 
             if thought_due:
-                self._generate_thought(current_time)
+                self._submit_thought(self.thought_executor, current_time)
                 self.last_thought_time = current_time
 
             # Record emotion history more frequently
             if current_time - self.last_update_time > self.update_frequency:
-                self.emotion_history.append(self.emotions.copy())
-                if len(self.emotion_history) > 300:  # 5 minutes worth
-                    self.emotion_history = self.emotion_history[-300:]
+                self.emotion_history.append(current_time, self.emotion_state.copy())
                 self.last_update_time = current_time
 
             # Sleep briefly - shorter sleep for more responsive updates
             time.sleep(0.05)
 
-    def _apply_decay(self, elapsed_time):
-        """Decay emotions gradually toward 0"""
-        # Calculate decay factor based on elapsed time
-        decay_factor = self.decay_rate ** elapsed_time
+    def _submit_thought(self, executor, timestamp):
+        """Start generating a thought on an executor unless one is already in flight
 
-        for emotion in self.emotions:
-            # More intense emotions decay more slowly
-            intensity_factor = 0.2 + (self.emotions[emotion] * 0.8)
-            adjusted_decay = decay_factor ** intensity_factor
+        Args:
+            executor: Executor to run the thought on
+            timestamp: Time the thought is due
 
-            # Apply decay with small random variation for more natural movement
-            variation = 1.0 + random.uniform(-0.05, 0.05)  # ±5% variation
-            self.emotions[emotion] *= adjusted_decay * variation
+        Returns:
+            bool: True if the thought was submitted, False if it was dropped
+        """
+        if not self._thoughts_active(timestamp):
+            return False
 
-    def _apply_noise(self):
-        """Apply small random changes to emotions"""
-        for emotion in self.emotions:
-            # Dynamic noise scale - less predictable
-            intensity = self.emotions[emotion]
-            base_noise = self.noise_magnitude * (1.0 - intensity * 0.7)  # Less reduction at high intensity
+        with self.state_lock:
+            if self.thought_in_flight:
+                self.thoughts_dropped += 1
+                return False
+            self.thought_in_flight = True
 
-            # Random fluctuation in noise amount
-            noise_scale = base_noise * random.uniform(0.5, 1.5)
+        try:
+            executor.submit(self._run_thought, timestamp)
+        except Exception as e:
+            print(f"Error submitting thought: {e}")
+            self.thought_in_flight = False
+            return False
+        return True
 
-            # Apply noise
-            noise = random.uniform(-noise_scale, noise_scale)
-            self.emotions[emotion] = max(0.0, min(1.0, self.emotions[emotion] + noise))
+    def _run_thought(self, timestamp):
+        """Generate a thought on a worker thread, clearing the in-flight flag when done"""
+        try:
+            if self.running:
+                self._generate_thought(timestamp)
+        finally:
+            self.thought_in_flight = False
+
+    def _thoughts_active(self, now):
+        """Whether background thoughts should be generated at time now (see thought_window)"""
+        if self.thought_window is None:
+            return True
+        return self.interacted and now - self.last_interaction < self.thought_window
+
+    def _note_interaction(self):
+        """Record that a message arrived, restarting event-driven thoughts if they went quiet"""
+        with self.state_lock:
+            self.last_interaction = time.time()
+            self.interacted = True
+            if self.event_driven and self.running and self.thought_timer is None:
+                self._schedule_thought()
+
+    def _schedule_thought(self):
+        """Schedule the next background thought (event-driven mode)"""
+        delay = self.rng.uniform(self.thought_frequency * 0.5, self.thought_frequency * 1.5)
+        self.thought_timer = threading.Timer(delay, self._thought_due)
+        self.thought_timer.daemon = True
+        self.thought_timer.start()
+
+    def _thought_due(self):
+        """Generate a thought when its timer fires, then schedule the next one"""
+        if not self.running:
+            return
+        current_time = time.time()
+        with self.state_lock:
+            if not self._thoughts_active(current_time):
+                # Stay quiet until the next message schedules thoughts again
+                self.thought_timer = None
+                return
+        self._generate_thought(current_time)
+        self.last_thought_time = current_time
+        if self.running:
+            self._schedule_thought()
+
+    def _advance(self, now):
+        """Bring the event-driven state forward to now (closed-form decay, no stepping)
+
+        History samples due since the last one are filled in first, from the closed form,
+        so the history matches what a reader would have seen at each sample time.
+
+        Args:
+            now: Time to advance to
+        """
+        with self.state_lock:
+            if now <= self.state_time:
+                return
+
+            sample_count = int((now - self.last_update_time) / self.update_frequency)
+            if sample_count > 0:
+                # Nothing older than the coarsest history tier keeps could be read back
+                retained = self.emotion_history.resolutions[-1] * self.emotion_history.buffers[-1].capacity
+                first_sample = max(1, sample_count - int(retained / self.update_frequency))
+                sample_times = self.last_update_time + self.update_frequency * np.arange(first_sample, sample_count + 1)
+                self.emotion_history.extend(sample_times, self._emotions_at(sample_times))
+                self.last_update_time += self.update_frequency * sample_count
+
+            self.emotion_state[:] = decay_closed_form(self.emotion_state, now - self.state_time, self.decay_rate)
+            self.state_time = now
+
+    def _emotions_at(self, times):
+        """Evaluate event-driven emotions at times since state_time, without changing the state
+
+        Args:
+            times: Time or array of times, none earlier than state_time
+
+        Returns:
+            numpy.ndarray: Emotion intensities, shaped times.shape + (len(EMOTIONS),)
+        """
+        times = np.asarray(times, dtype=float)
+        decayed = decay_closed_form(self.emotion_state, (times - self.state_time)[..., None], self.decay_rate)
+        return apply_fluctuation(decayed, self.noise.value(times), self.micro_noise.value(times),
+                                 self.noise_amplitude, self.micro_amplitude)
 
-    def _apply_micro_fluctuations(self):
-        """Apply tiny fluctuations to create more natural emotion movement"""
-        # Pick 2-3 random emotions to adjust
-        emotions_to_adjust = random.sample(list(self.emotions.keys()), random.randint(2, 3))
+    def _sync_emotions(self):
+        """Advance the event-driven state to now and return the emotions as of now"""
+        now = time.time()
+        with self.state_lock:
+            self._advance(now)
+            return self._emotions_at(now)
 
-        for emotion in emotions_to_adjust:
-            # Very small adjustments
-            micro_change = random.uniform(-0.03, 0.03)
+    def _bind_state(self, state, lock):
+        """Use another vector as the emotion state, e.g. a row of a runtime's state matrix
 
-            # Apply with preference toward the middle range (more movement in neutral states)
-            distance_from_mid = abs(self.emotions[emotion] - 0.5)
-            if distance_from_mid > 0.3:  # Emotions far from neutral move less
-                micro_change *= (1.0 - distance_from_mid)
+        Args:
+            state: Emotion state vector, already holding the current emotions
+            lock: Lock guarding the vector, shared with whoever else writes to it
+        """
+        self.state_lock = lock
+        self.emotion_state = state
+        self.emotions.rebind(state, lock)
+
+    def _step_emotions(self, elapsed_time, micro_fluctuations=False):
+        """Decay emotions toward 0 and apply random noise, optionally with micro-fluctuations
+
+        Args:
+            elapsed_time: Seconds of decay to apply
+            micro_fluctuations: Also nudge 2-3 random emotions
+        """
+        with self.state_lock:
+            state = self.emotion_state.copy()
+            apply_decay(state, elapsed_time, self.decay_rate, self.rng)
+            apply_noise(state, self.noise_magnitude, self.rng)
+            if micro_fluctuations:
+                apply_micro_fluctuations(state, self.rng)
+            self.emotion_state[:] = state
 
-            # Apply the micro-fluctuation
-            self.emotions[emotion] = max(0.0, min(1.0, self.emotions[emotion] + micro_change))
+    def _apply_impact(self, impact, min_change=0.0):
+        """Add emotion changes to the current state as one update, clamped to 0-1
+
+        Args:
+            impact: Dict of emotion name to change
+            min_change: Changes this small or smaller are ignored
+        """
+        delta = impact_vector(impact, min_change)
+        with self.state_lock:
+            if self.event_driven:
+                self._advance(time.time())
+            self.emotion_state[:] = np.clip(self.emotion_state + delta, 0.0, 1.0)
 
     def _generate_thought(self, timestamp):
         """Generate a background thought using OpenAI API"""
@@ -138,7 +316,7 @@ class EmotionalSystem:
         time_str = datetime.fromtimestamp(timestamp).strftime('%H:%M:%S')
 
         # Format emotions for the prompt
-        emotion_text = ", ".join([f"{emotion}: {value:.2f}" for emotion, value in self.emotions.items()])
+        emotion_text = ", ".join([f"{emotion}: {value:.2f}" for emotion, value in self.emotions.copy().items()])
 
         # Get recent conversation for context
         recent_messages = self.conversation[-3:] if self.conversation else []
@@ -154,12 +332,7 @@ class EmotionalSystem:
                     memory_texts = [mem[0]['text'][:100] + "..." for mem in related_memories[:1]]
                     memory_context = "Related memory: " + memory_texts[0]
 
-            # Call OpenAI API to generate a thought
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You generate brief, natural thoughts for an AI assistant based on its current emotional state and conversation context. Generate only the thought itself, no explanations or additional text."},
-                    {"role": "user", "content": f"""
+            thought_prompt = f"""
 Current time: {time_str}
 Emotional state: {emotion_text}
 {memory_context}
@@ -168,75 +341,213 @@ Recent conversation:
 {context}
 
 Generate a single brief, natural thought (1-2 sentences) that might occur to an AI assistant in this moment.
-                    """}
-                ],
-                max_tokens=60,
-                temperature=0.7
-            )
-
-            thought = response.choices[0].message.content.strip()
-
-            # Record the thought
+                    """
+
+            # Generate the thought and its impact in one structured call, falling back to
+            # separate calls if the response is unusable
+            thought, impact = self._generate_thought_with_impact(thought_prompt) if self.combined_thoughts else (None, None)
+
+            if not thought:
+                # Call OpenAI API to generate a thought
+                response = self.llm.create(
+                    caller="emotion",
+                    priority=BACKGROUND,
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": "You generate brief, natural thoughts for an AI assistant based on its current emotional state and conversation context. Generate only the thought itself, no explanations or additional text."},
+                        {"role": "user", "content": thought_prompt}
+                    ],
+                    max_tokens=60,
+                    temperature=0.7
+                )
+                thought = response.choices[0].message.content.strip()
+
+            if impact is None:
+                # Score the thought's emotional impact (using OpenAI again)
+                impact = self._analyze_thought_impact(thought)
+
+            # Record the thought and apply its impact as one update, keeping only recent thoughts
             thought_obj = {
                 "text": thought,
                 "time": timestamp,
                 "formatted_time": datetime.fromtimestamp(timestamp).strftime('%H:%M:%S'),
                 "emotions": self.emotions.copy()
             }
+            with self.state_lock:
+                self.thoughts = (self.thoughts + [thought_obj])[-10:]
+                self._apply_impact(impact)
 
-            self.thoughts.append(thought_obj)
+        except Exception as e:
+            print(f"Error generating thought: {e}")
 
-            # Keep only recent thoughts
-            if len(self.thoughts) > 10:
-                self.thoughts = self.thoughts[-10:]
+    def _generate_thought_with_impact(self, thought_prompt):
+        """Generate a thought and its emotional impact in a single JSON response
 
-            # Update emotions based on thought (using OpenAI again)
-            self._analyze_thought_impact(thought)
+        Args:
+            thought_prompt: Prompt describing the current time, emotions and context
 
+        Returns:
+            tuple: (thought, impact). thought is None if the call failed or returned no
+                usable thought; impact is None if only the impact was unusable.
+        """
+        emotion_names = ", ".join(EMOTIONS)
+        try:
+            response = self.llm.create(
+                caller="emotion",
+                priority=BACKGROUND,
+                model="gpt-3.5-turbo",
+                response_format={"type": "json_object"},
+                messages=[
+                    {"role": "system", "content": f"You generate brief, natural thoughts for an AI assistant based on its current emotional state and conversation context, and analyze how each thought would impact its emotions. Respond only with a JSON object of the form {{\"thought\": \"...\", \"impact\": {{\"joy\": 0.0, ...}}}}, where impact has these emotions as keys: {emotion_names}, with values from -{self.max_impact} to {self.max_impact} indicating how much each emotion should change."},
+                    {"role": "user", "content": thought_prompt}
+                ],
+                max_tokens=200,
+                temperature=0.7
+            )
+            thought, impact = self._parse_thought_with_impact(response.choices[0].message.content)
         except Exception as e:
-            print(f"Error generating thought: {e}")
+            print(f"Error generating thought with impact: {e}")
+            thought, impact = None, None
+
+        if not thought:
+            self.thought_stats["fallbacks"] += 1
+        elif impact is None:
+            self.thought_stats["impact_fallbacks"] += 1
+        else:
+            self.thought_stats["combined"] += 1
+        return thought, impact
+
+    def _parse_thought_with_impact(self, content):
+        """Validate a combined thought response
+
+        Args:
+            content: Response text, expected to hold {"thought": str, "impact": {emotion: number}}
+
+        Returns:
+            tuple: (thought, impact) - either is None if it is missing or malformed
+        """
+        try:
+            data = json.loads(self._extract_json(content))
+        except (json.JSONDecodeError, TypeError):
+            print(f"Error parsing thought with impact: {content}")
+            return None, None
+        if not isinstance(data, dict):
+            return None, None
+
+        thought = data.get("thought")
+        thought = thought.strip() if isinstance(thought, str) and thought.strip() else None
+        return thought, self._validate_impact(data.get("impact"))
+
+    def _validate_impact(self, impact):
+        """Check an impact object and clamp its changes to ±max_impact
+
+        Unknown emotions are ignored and missing ones count as no change.
+
+        Args:
+            impact: Parsed impact, expected to be a dict of emotion name to number
+
+        Returns:
+            dict: Change per emotion, or None if impact is not a dict of numbers
+        """
+        if not isinstance(impact, dict):
+            return None
+
+        validated = {}
+        for emotion in EMOTIONS:
+            change = impact.get(emotion, 0.0)
+            if isinstance(change, bool) or not isinstance(change, (int, float)) or not np.isfinite(change):
+                return None
+            validated[emotion] = float(np.clip(change, -self.max_impact, self.max_impact))
+        return validated
+
+    def _parse_impact(self, content):
+        """Parse and validate an impact analysis response, like the combined thought path does
+
+        Args:
+            content: Response text, expected to hold {emotion: number}
+
+        Returns:
+            dict: Change per emotion clamped to ±max_impact (empty if the response is malformed)
+        """
+        try:
+            impact = self._validate_impact(json.loads(self._extract_json(content)))
+        except (json.JSONDecodeError, TypeError):
+            impact = None
+        if impact is None:
+            print(f"Error parsing emotional impact: {content}")
+            return {}
+        return impact
+
+    def _extract_json(self, content):
+        """Extract JSON from a response that may wrap it in backticks or explanatory text"""
+        content = content.strip()
+        if "```json" in content:
+            return content.split("```json")[1].split("```")[0].strip()
+        if "```" in content:
+            return content.split("```")[1].strip()
+        start, end = content.find("{"), content.rfind("}")
+        if start >= 0 and end > start:
+            return content[start:end + 1]
+        return content
+
+    def _local_impact(self, text):
+        """Analyze emotional impact with the in-process lexicon, if the analysis mode allows
+
+        Args:
+            text: Message or thought text
+
+        Returns:
+            dict: Emotion changes, or None if the LLM should analyze the text instead
+        """
+        if self.impact_analysis != "llm":
+            impact, confidence = self.lexicon.analyze(text)
+            if self.impact_analysis == "local" or confidence >= self.local_confidence_threshold:
+                self.analysis_stats["local"] += 1
+                return impact
+        self.analysis_stats["llm"] += 1
+        return None
 
     def _analyze_thought_impact(self, thought):
-        """Analyze emotional impact of a thought using OpenAI API"""
+        """Analyze emotional impact of a thought using OpenAI API
+
+        Args:
+            thought: Thought text
+
+        Returns:
+            dict: Emotion changes (empty if the analysis failed)
+        """
+        impact = self._local_impact(thought)
+        if impact is not None:
+            return impact
+
         try:
             # Call OpenAI to analyze emotional impact
-            response = self.client.chat.completions.create(
+            response = self.llm.create(
+                caller="emotion",
+                priority=BACKGROUND,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You analyze how a thought would impact emotions. You return a JSON object with emotion names as keys and values from -0.2 to 0.2 indicating how much each emotion should change."},
                     {"role": "user", "content": f"Analyze the emotional impact of this thought: '{thought}'. Return a JSON object with these emotions: joy, sadness, anger, fear, surprise, trust, disgust, anticipation. Values should be from -0.2 to 0.2."}
                 ],
                 max_tokens=150,
-                temperature=0.3
+                temperature=0.3,
+                coalesce=True
             )
 
-            # Extract JSON from response
-            analysis_text = response.choices[0].message.content.strip()
-            try:
-                # Extract JSON if it's wrapped in backticks or has explanatory text
-                if "```json" in analysis_text:
-                    json_str = analysis_text.split("```json")[1].split("```")[0].strip()
-                elif "```" in analysis_text:
-                    json_str = analysis_text.split("```")[1].strip()
-                else:
-                    json_str = analysis_text
-
-                impact = json.loads(json_str)
-
-                # Update emotions based on the analysis
-                for emotion, change in impact.items():
-                    if emotion in self.emotions:
-                        self.emotions[emotion] = max(0.0, min(1.0, self.emotions[emotion] + float(change)))
-
-            except json.JSONDecodeError:
-                print(f"Error parsing emotional impact: {analysis_text}")
+            return self._parse_impact(response.choices[0].message.content)
 
         except Exception as e:
             print(f"Error analyzing thought impact: {e}")
+            return {}
 
     def process_message(self, message):
         """Process a user message, update emotions, and generate a response
 
+        The impact analysis runs on a worker thread while the query is embedded once and
+        used for both memory lookups, and the response is generated as soon as the impact
+        has been applied.
+
         Args:
             message: User message text
 
@@ -244,45 +555,40 @@ Generate a single brief, natural thought (1-2 sentences) that might occur to an
             str: Generated response
         """
         # Update last interaction time
-        self.last_interaction = time.time()
+        self._note_interaction()
 
         # Add to conversation history
-        self.conversation.append(f"User: {message}")
+        self._add_to_conversation(f"User: {message}")
 
         try:
-            # Check for emotional memories that might be triggered
-            memory_influences = {}
-            if self.memory_system:
-                related_emotional = self.memory_system.find_emotional_memories(message)
-                for memory, similarity in related_emotional:
-                    if memory.get("emotions"):
-                        influence_strength = similarity * 0.3  # Scale by similarity
-                        for emotion, value in memory["emotions"].items():
-                            deviation = (value - 0.5) * influence_strength
-                            if emotion in memory_influences:
-                                memory_influences[emotion] += deviation
-                            else:
-                                memory_influences[emotion] = deviation
-
-            # Analyze message for direct emotional impact
-            direct_impacts = self._analyze_message_impact(message)
-
-            # Apply combined emotional impacts (memory has 30% weight)
-            combined_impacts = {}
-            for emotion in self.emotions:
-                direct = direct_impacts.get(emotion, 0) if isinstance(direct_impacts, dict) else 0
-                memory = memory_influences.get(emotion, 0)
-                combined_impacts[emotion] = (direct * 0.7) + (memory * 0.3)
-
-                # Apply significant emotional changes
-                if abs(combined_impacts[emotion]) > 0.01:
-                    self.emotions[emotion] = max(0.0, min(1.0, self.emotions[emotion] + combined_impacts[emotion]))
+            related_memories = None
+            if self.parallel_requests:
+                # Analyze message for direct emotional impact, in parallel with memory retrieval
+                impact_future = self.request_executor.submit(self._analyze_message_impact, message)
+
+                # Check for emotional memories that might be triggered, and find related
+                # memories for the response, sharing one query embedding
+                query_embedding = None
+                if self.memory_system and hasattr(self.memory_system, "encode_query"):
+                    query_embedding = self.memory_system.encode_query(message)
+                memory_influences = self._find_memory_influences(message, query_embedding)
+                if self.memory_system:
+                    related_memories = self.memory_system.find_related_memories(message, query_embedding=query_embedding)
+
+                direct_impacts = impact_future.result()
+            else:
+                # One step after another; related memories are looked up by _generate_response
+                memory_influences = self._find_memory_influences(message)
+                direct_impacts = self._analyze_message_impact(message)
+
+            # Apply significant emotional changes
+            self._apply_impact(self._combine_impacts(direct_impacts, memory_influences), min_change=0.01)
 
             # Generate response using OpenAI
-            response = self._generate_response(message)
+            response = self._generate_response(message, related_memories=related_memories)
 
             # Add response to conversation
-            self.conversation.append(f"AI: {response}")
+            self._add_to_conversation(f"AI: {response}")
 
             # Store this interaction in memory
             conversation_text = f"User: {message}\nAI: {response}"
@@ -292,16 +598,136 @@ Generate a single brief, natural thought (1-2 sentences) that might occur to an
                 emotions=self.emotions.copy()
             )
 
-            # Keep conversation history manageable
-            if len(self.conversation) > 20:
-                self.conversation = self.conversation[-20:]
-
             return response
 
         except Exception as e:
             print(f"Error processing message: {e}")
             return "I'm sorry, I encountered an error processing your message."
 
+    def stream_message(self, message):
+        """Process a user message, yielding the response as it streams in
+
+        The response starts from the current emotional state as soon as related memories
+        are found. The message's emotional impact is analyzed meanwhile, and the impact and
+        the memory of the exchange are committed on a worker thread once the stream ends,
+        off the response path.
+
+        Args:
+            message: User message text
+
+        Yields:
+            str: Response text deltas
+        """
+        self._note_interaction()
+        self._add_to_conversation(f"User: {message}")
+
+        impact_future = self.request_executor.submit(self._analyze_message_impact, message)
+        query_embedding = None
+        if self.memory_system and hasattr(self.memory_system, "encode_query"):
+            query_embedding = self.memory_system.encode_query(message)
+        memory_influences = self._find_memory_influences(message, query_embedding)
+        related_memories = None
+        if self.memory_system:
+            related_memories = self.memory_system.find_related_memories(message, query_embedding=query_embedding)
+
+        response_text = ""
+        try:
+            for text in self._stream_response(self._response_request(message, related_memories)):
+                response_text += text
+                yield text
+        except Exception as e:
+            print(f"Error streaming response: {e}")
+            if not response_text:
+                response_text = "I'm sorry, I encountered an error generating a response."
+                yield response_text
+        finally:
+            # Runs even if the client disconnects mid-stream, keeping what was sent
+            response_text = response_text.strip()
+            self._add_to_conversation(f"AI: {response_text}")
+            try:
+                self.request_executor.submit(self._commit_turn, message, response_text, impact_future,
+                                             memory_influences)
+            except RuntimeError as e:
+                print(f"Not committing conversation turn after stop: {e}")
+
+    def _commit_turn(self, message, response, impact_future, memory_influences):
+        """Apply a streamed turn's emotional impact and store it in memory
+
+        Args:
+            message: User message text
+            response: Response text that was streamed
+            impact_future: Future of the message's direct emotional impact
+            memory_influences: Emotion influences of the memories the message triggered
+        """
+        try:
+            self._apply_impact(self._combine_impacts(impact_future.result(), memory_influences), min_change=0.01)
+            self.memory_system.add_memory(
+                f"User: {message}\nAI: {response}",
+                source="conversation",
+                emotions=self.emotions.copy()
+            )
+        except Exception as e:
+            print(f"Error committing conversation turn: {e}")
+
+    def _combine_impacts(self, direct_impacts, memory_influences):
+        """Blend a message's direct impact with the pull of triggered memories (memory has 30% weight)
+
+        Args:
+            direct_impacts: Emotion changes from analyzing the message
+            memory_influences: Emotion influences from _find_memory_influences
+
+        Returns:
+            dict: Combined change per emotion
+        """
+        combined_impacts = {}
+        for emotion in self.emotions:
+            direct = direct_impacts.get(emotion, 0) if isinstance(direct_impacts, dict) else 0
+            memory = memory_influences.get(emotion, 0)
+            combined_impacts[emotion] = (direct * 0.7) + (memory * 0.3)
+        return combined_impacts
+
+    def _find_memory_influences(self, message, query_embedding=None):
+        """Work out how emotional memories triggered by a message pull on each emotion
+
+        Args:
+            message: User message text
+            query_embedding: Optional precomputed embedding of the message
+
+        Returns:
+            dict: Emotion name to influence
+        """
+        memory_influences = {}
+        find_emotional_memories = getattr(self.memory_system, "find_emotional_memories", None)
+        if not find_emotional_memories:
+            return memory_influences
+
+        try:
+            related_emotional = find_emotional_memories(message, query_embedding=query_embedding,
+                                                        emotions=self.emotions.copy())
+        except Exception as e:
+            print(f"Error finding emotional memories: {e}")
+            return memory_influences
+
+        for memory, similarity in related_emotional:
+            if memory.get("emotions"):
+                influence_strength = similarity * 0.3  # Scale by similarity
+                for emotion, value in memory["emotions"].items():
+                    deviation = (value - 0.5) * influence_strength
+                    if emotion in memory_influences:
+                        memory_influences[emotion] += deviation
+                    else:
+                        memory_influences[emotion] = deviation
+        return memory_influences
+
+    def _add_to_conversation(self, line):
+        """Append a line to the conversation history, keeping it manageable
+
+        Args:
+            line: Conversation line
+        """
+        with self.state_lock:
+            self.conversation = (self.conversation + [line])[-20:]
+
     def _analyze_message_impact(self, message):
         """Analyze emotional impact of user message using OpenAI API
 
@@ -311,51 +737,91 @@ Generate a single brief, natural thought (1-2 sentences) that might occur to an
         Returns:
             dict: Emotional impacts
         """
+        impact = self._local_impact(message)
+        if impact is not None:
+            return impact
+
         try:
             # Call OpenAI to analyze emotional impact
-            response = self.client.chat.completions.create(
+            response = self.llm.create(
+                caller="emotion",
+                priority=INTERACTIVE,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You analyze how a message would impact emotions. You return a JSON object with emotion names as keys and values from -0.2 to 0.2 indicating how much each emotion should change."},
                     {"role": "user", "content": f"Analyze the emotional impact of this message: '{message}'. Return a JSON object with these emotions: joy, sadness, anger, fear, surprise, trust, disgust, anticipation. Values should be from -0.2 to 0.2."}
                 ],
                 max_tokens=150,
-                temperature=0.3
+                temperature=0.3,
+                coalesce=True
             )
 
-            # Extract JSON from response
-            analysis_text = response.choices[0].message.content.strip()
-            try:
-                # Extract JSON if it's wrapped in backticks or has explanatory text
-                if "```json" in analysis_text:
-                    json_str = analysis_text.split("```json")[1].split("```")[0].strip()
-                elif "```" in analysis_text:
-                    json_str = analysis_text.split("```")[1].strip()
-                else:
-                    json_str = analysis_text
-
-                impact = json.loads(json_str)
-                return impact
-
-            except json.JSONDecodeError:
-                print(f"Error parsing emotional impact: {analysis_text}")
-                return {}
+            return self._parse_impact(response.choices[0].message.content)
 
         except Exception as e:
             print(f"Error analyzing message impact: {e}")
             return {}
 
-    def _generate_response(self, message):
+    def _generate_response(self, message, on_token=None, related_memories=None):
         """Generate a response using OpenAI that takes into account emotional state
 
         Args:
             message: User message text
+            on_token: Optional callback receiving each text delta as it streams in.
+                Streaming is used when this is given or streaming_enabled is set.
+            related_memories: Memories already retrieved for the message. Looked up if None.
 
         Returns:
             str: Generated response
         """
+        request = self._response_request(message, related_memories)
+
+        try:
+            if on_token is None and not self.streaming_enabled:
+                response = self.llm.create(**request)
+                return response.choices[0].message.content.strip()
+
+            # Stream the response, passing each piece on as soon as it arrives
+            response_text = ""
+            for text in self._stream_response(request):
+                response_text += text
+                if on_token:
+                    on_token(text)
+            return response_text.strip()
+
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            return "I'm sorry, I encountered an error generating a response."
+
+    def _stream_response(self, request):
+        """Stream a response, yielding text as it arrives and keeping partial_response current
+
+        Args:
+            request: Chat completion request from _response_request
+
+        Yields:
+            str: Text deltas
+        """
+        self.partial_response = ""
+        try:
+            for text in self.llm.stream(**request):
+                self.partial_response += text
+                yield text
+        finally:
+            self.partial_response = None
+
+    def _response_request(self, message, related_memories=None):
+        """Build the chat completion request for a response shaped by the emotional state
+
+        Args:
+            message: User message text
+            related_memories: Memories already retrieved for the message. Looked up if None.
+
+        Returns:
+            dict: Keyword arguments for LLMGateway.create or stream
+        """
         # Format emotions for the prompt
-        emotion_text = ", ".join([f"{emotion}: {value:.2f}" for emotion, value in self.emotions.items()])
+        emotion_text = ", ".join([f"{emotion}: {value:.2f}" for emotion, value in self.emotions.copy().items()])
 
         # Get recent thoughts
         recent_thoughts = [t["text"] for t in self.thoughts[-3:]] if self.thoughts else []
@@ -364,7 +830,8 @@ Generate a single brief, natural thought (1-2 sentences) that might occur to an
         # Find related memories to include in context
         memory_context = ""
         if self.memory_system:
-            related_memories = self.memory_system.find_related_memories(message)
+            if related_memories is None:
+                related_memories = self.memory_system.find_related_memories(message)
             if related_memories:
                 memory_texts = [f"- {mem[0]['text'][:100]}..." for mem in related_memories]
                 memory_context = "Related memories:\n" + "\n".join(memory_texts)
@@ -373,12 +840,12 @@ Generate a single brief, natural thought (1-2 sentences) that might occur to an
         recent_messages = self.conversation[-6:] if self.conversation else []
         context = "\n".join(recent_messages)
 
-        try:
-            # Call OpenAI API to generate response
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": f"""You are an AI assistant with an emotional state that influences your responses.
+        return dict(
+            caller="emotion",
+            priority=INTERACTIVE,
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": f"""You are an AI assistant with an emotional state that influences your responses.
 
 Current emotional state:
 {emotion_text}
@@ -389,41 +856,60 @@ Recent background thoughts:
 {memory_context}
 
 Your response should be influenced by your current emotional state and memories, but you should not explicitly mention your emotions unless directly asked about them. The emotional influence should be subtle and natural, affecting your tone, word choice, and perspective.
-                    """},
-                    {"role": "user", "content": message}
-                ],
-                max_tokens=250,
-                temperature=0.7
-            )
-
-            return response.choices[0].message.content.strip()
-
-        except Exception as e:
-            print(f"Error generating response: {e}")
-            return "I'm sorry, I encountered an error generating a response."
-
-    def get_state(self):
+                """},
+                {"role": "user", "content": message}
+            ],
+            max_tokens=250,
+            temperature=0.7
+        )
+
+    def get_state(self, window=60, resolution=None):
         """Get the current emotional state for display in UI
 
+        Args:
+            window: Seconds of emotion history to include (None for all that is kept)
+            resolution: Seconds between history samples. Defaults to the finest
+                resolution that covers the window.
+
         Returns:
-            dict: Current emotional state
+            dict: Current emotional state, with the history as columns of samples
         """
+        now = time.time()
+        if self.event_driven:
+            self._advance(now)
+
+        history_resolution, times, values = self.emotion_history.get(window=window, resolution=resolution, now=now)
         return {
-            "emotions": self.emotions,
+            "emotions": self.emotions.copy(),
             "thoughts": self.thoughts,
-            "history": self.emotion_history
+            "history": {
+                "resolution": history_resolution,
+                "times": times.tolist(),
+                "emotions": dict(zip(EMOTIONS, values.T.tolist()))
+            },
+            "partial_response": self.partial_response
         }
 
     def reset(self):
         """Reset the emotional system state"""
-        for emotion in self.emotions:
-            self.emotions[emotion] = 0.0
-        self.thoughts = []
-        self.emotion_history = [self.emotions.copy()]
+        with self.state_lock:
+            self.emotion_state[:] = 0.0
+            self.state_time = self.last_update_time = time.time()
+            self.thoughts = []
+            self.emotion_history.clear()
+            self.emotion_history.append(self.state_time, list(self.emotions.copy().values()))
         # Keep conversation history
 
     def stop(self):
-        """Stop the background thread"""
+        """Stop the background thread, the thought timer in event-driven mode, or leave the runtime"""
         self.running = False
-        if self.background_thread.is_alive():
+        if self.runtime:
+            self.runtime.unregister(self)
+        if self.thought_timer:
+            self.thought_timer.cancel()
+        if self.thought_executor:
+            self.thought_executor.shutdown(wait=False)
+        if not self.runtime:
+            self.request_executor.shutdown(wait=False)
+        if self.background_thread and self.background_thread.is_alive():
             self.background_thread.join(timeout=1.0)
\ No newline at end of file
@@ -0,0 +1,664 @@
+import threading
+import time
+import random
+import itertools
+import json
+from collections import deque
+
+import openai
+
+from prompt_packing import estimate_tokens
+from single_flight import SingleFlight
+
+# Priority classes - interactive (user-facing) calls are always admitted before queued background calls
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+
+class BudgetExhausted(Exception):
+    """Raised when a call would overrun the token budget it is charged to"""
+
+
+class TokenBudget:
+    def __init__(self, max_tokens=None):
+        """Token budget shared by the LLM calls of one unit of work, such as a dream cycle
+
+        Args:
+            max_tokens: Maximum tokens the calls may use. None tracks usage without a limit.
+        """
+        self.max_tokens = max_tokens
+        self.used_tokens = 0
+        self.reserved_tokens = 0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self):
+        """Tokens left after usage and in-flight reservations (None if unlimited)"""
+        if self.max_tokens is None:
+            return None
+        return max(0, self.max_tokens - self.used_tokens - self.reserved_tokens)
+
+    @property
+    def exhausted(self):
+        """Whether the budget has been spent"""
+        return self.max_tokens is not None and self.used_tokens >= self.max_tokens
+
+    def reserve(self, tokens):
+        """Reserve tokens for a call about to be issued
+
+        Args:
+            tokens: Estimated tokens for the call
+
+        Raises:
+            BudgetExhausted: If the call does not fit in the remaining budget
+        """
+        with self._lock:
+            if self.max_tokens is not None and self.used_tokens + self.reserved_tokens + tokens > self.max_tokens:
+                raise BudgetExhausted(
+                    f"Token budget exhausted ({self.used_tokens}/{self.max_tokens} used, call needs ~{tokens})"
+                )
+            self.reserved_tokens += tokens
+
+    def settle(self, reserved, used):
+        """Replace a reservation with the tokens the call actually used
+
+        Args:
+            reserved: Tokens reserved for the call
+            used: Tokens the call used (0 if it failed)
+        """
+        with self._lock:
+            self.reserved_tokens = max(0, self.reserved_tokens - reserved)
+            self.used_tokens += used
+
+
+class Cancelled(Exception):
+    """Raised when the work a call belongs to was cancelled or ran past its deadline"""
+
+
+class CancellationToken:
+    def __init__(self, timeout=None):
+        """Cooperative cancellation signal for one unit of work, such as a dream cycle
+
+        The work checks the token between steps and the gateway checks it before and
+        while waiting for each call. The token also trips by itself once its deadline
+        passes.
+
+        Args:
+            timeout: Seconds until the deadline. None means no deadline.
+        """
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.reason = None
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self):
+        """Whether the work was cancelled or its deadline has passed"""
+        if not self._event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("Deadline exceeded")
+        return self._event.is_set()
+
+    def cancel(self, reason="Cancelled"):
+        """Cancel the work
+
+        Args:
+            reason: Why the work was cancelled
+        """
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def remaining(self):
+        """Seconds left until the deadline (None if there is none)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        """Raise if the work was cancelled
+
+        Raises:
+            Cancelled: If the work was cancelled or its deadline has passed
+        """
+        if self.cancelled:
+            raise Cancelled(self.reason)
+
+    def sleep(self, seconds):
+        """Sleep, waking early if the work is cancelled
+
+        Args:
+            seconds: How long to sleep
+
+        Raises:
+            Cancelled: If the work is cancelled before or during the sleep
+        """
+        remaining = self.remaining()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        self._event.wait(max(0.0, seconds))
+        self.check()
+
+
+class TokenBucket:
+    def __init__(self, per_minute, capacity=None):
+        """Token bucket refilled continuously at a per-minute rate
+
+        Args:
+            per_minute: Refill rate per minute
+            capacity: Maximum burst size. Defaults to one minute's worth.
+        """
+        self.capacity = capacity or per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until the bucket holds the given amount (0 if it does now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount, now):
+        """Take the given amount out of the bucket"""
+        self._refill(now)
+        self.tokens -= amount
+
+    def refund(self, amount, now):
+        """Return (or, if negative, take) tokens after the actual usage is known"""
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def fill_ratio(self, now):
+        """Fraction of the bucket currently available"""
+        self._refill(now)
+        return max(0.0, self.tokens / self.capacity)
+
+
+class LLMGateway:
+    def __init__(self, client, requests_per_minute=3500, tokens_per_minute=90000,
+                 max_retries=5, base_backoff=1.0, max_backoff=30.0, concurrency_limits=None):
+        """Shared gateway for chat completion calls
+
+        Applies request and token rate limits, retries rate-limit and server errors with
+        exponential backoff and jitter, and charges calls to token budgets. Waiting calls
+        are admitted by priority class first, so interactive calls jump ahead of queued
+        background calls, then round-robin by caller so one busy caller cannot starve the
+        others. Each priority class has its own cap on calls in flight.
+
+        Args:
+            client: OpenAI client (None if unavailable)
+            requests_per_minute: Request rate limit
+            tokens_per_minute: Token rate limit
+            max_retries: Maximum retries for a failed call
+            base_backoff: Backoff before the first retry (seconds)
+            max_backoff: Upper bound on the backoff between retries (seconds)
+            concurrency_limits: Max calls in flight per priority class
+        """
+        self.client = self._without_client_retries(client)
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._request_bucket = TokenBucket(requests_per_minute)
+        self._token_bucket = TokenBucket(tokens_per_minute)
+
+        # Fair scheduling state - waiters are served by the caller served longest ago
+        self._condition = threading.Condition()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._last_served = {}
+
+        # Identical requests in flight share one call, when the caller opts in and the
+        # request is near-deterministic
+        self._single_flight = SingleFlight()
+        self.coalesce_max_temperature = 0.3
+
+        # Per priority class concurrency caps and calls in flight
+        self.concurrency_limits = {INTERACTIVE: 8, BACKGROUND: 2}
+        if concurrency_limits:
+            self.concurrency_limits.update(concurrency_limits)
+        self._in_flight = {priority: 0 for priority in PRIORITIES}
+
+        # Recent queue-wait samples per priority class (seconds)
+        self._queue_waits = {priority: deque(maxlen=1000) for priority in PRIORITIES}
+
+        # How often a queued call with a cancellation token checks it (seconds)
+        self.cancel_poll_interval = 0.25
+
+        # Statistics
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "budget_rejections": 0,
+            "tokens_used": 0,
+            "throttle_wait": 0.0
+        }
+
+    def create(self, caller="default", budget=None, priority=BACKGROUND, coalesce=False,
+               cancel_token=None, timeout=None, **request):
+        """Create a chat completion through the gateway
+
+        Takes the same keyword arguments as client.chat.completions.create.
+
+        Args:
+            caller: Name used to schedule concurrent callers fairly
+            budget: Optional TokenBudget the call is charged to
+            priority: INTERACTIVE for user-facing calls, BACKGROUND otherwise
+            coalesce: Share the response of an identical request already in flight
+                instead of issuing another call. Only for idempotent calls: requests
+                sampled above coalesce_max_temperature are never coalesced, so callers
+                never silently share a "random" completion. Calls only share a leader of
+                the same priority and timeout, a waiting call still honors its own
+                cancel_token, and the call is only charged to the budget of the caller
+                that issued it.
+            cancel_token: Optional CancellationToken. The call stops waiting for its turn
+                or a retry once it is cancelled, and no attempt outlives its deadline.
+            timeout: Optional timeout for each attempt (seconds), passed to the client
+            **request: Chat completion arguments
+
+        Returns:
+            The chat completion response
+
+        Raises:
+            BudgetExhausted: If the call does not fit in the budget
+            Cancelled: If the call was cancelled or ran past its deadline
+        """
+        if self.client is None:
+            raise RuntimeError("OpenAI client not available")
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        if coalesce and request.get("temperature", 1.0) <= self.coalesce_max_temperature:
+            key = json.dumps({"priority": priority, "timeout": timeout, "request": request},
+                             sort_keys=True, default=str)
+            return self._single_flight.do(
+                key,
+                lambda: self._create_charged(caller, budget, priority, request, cancel_token, timeout),
+                wait=lambda done: self._wait_for_shared_call(done, cancel_token)
+            )
+        return self._create_charged(caller, budget, priority, request, cancel_token, timeout)
+
+    def _wait_for_shared_call(self, done, cancel_token=None):
+        """Wait for a coalesced call to finish, giving up if our own token is cancelled"""
+        if cancel_token is None:
+            done.wait()
+            return
+        while not done.wait(self.cancel_poll_interval):
+            cancel_token.check()
+
+    def _create_charged(self, caller, budget, priority, request, cancel_token=None, timeout=None):
+        """Issue a call charged to a token budget"""
+        estimated_tokens = self.estimate_tokens(request)
+        if budget is not None:
+            try:
+                budget.reserve(estimated_tokens)
+            except BudgetExhausted:
+                self._count("budget_rejections")
+                raise
+
+        used_tokens = 0
+        try:
+            response = self._create_with_retries(caller, priority, estimated_tokens, request,
+                                                 cancel_token, timeout)
+            used_tokens = self._response_tokens(response, estimated_tokens)
+            return response
+        finally:
+            if budget is not None:
+                budget.settle(estimated_tokens, used_tokens)
+
+    def _create_with_retries(self, caller, priority, estimated_tokens, request, cancel_token=None, timeout=None):
+        """Issue the call, retrying rate-limit and server errors with backoff"""
+        attempt = 0
+        while True:
+            self._acquire(caller, priority, estimated_tokens, cancel_token)
+            try:
+                self._count("requests")
+                response = self.client.chat.completions.create(
+                    **request, **self._timeout_argument(cancel_token, timeout))
+            except Exception as e:
+                self._release(priority)
+
+                # The call did not use its tokens, give them back to the bucket
+                self._reconcile(estimated_tokens, 0)
+
+                if attempt >= self.max_retries or not self._is_retryable(e, timeout):
+                    self._count("failures")
+                    raise
+
+                delay = self._backoff_delay(attempt, e)
+                attempt += 1
+                self._count("retries")
+                print(f"LLM call failed ({e}), retrying in {delay:.1f}s (attempt {attempt}/{self.max_retries})")
+                self._sleep(delay, cancel_token)
+                continue
+
+            self._release(priority)
+            used_tokens = self._response_tokens(response, estimated_tokens)
+            self._reconcile(estimated_tokens, used_tokens)
+            self._count("tokens_used", used_tokens)
+            return response
+
+    def stream(self, caller="default", budget=None, priority=BACKGROUND, cancel_token=None, timeout=None,
+               **request):
+        """Stream a chat completion through the gateway, yielding text as it arrives
+
+        Rate limits, priority classes and budgets apply as for create. Failures are only
+        retried before any text has arrived, and streamed calls are never coalesced.
+        Streamed responses carry no usage data, so token usage is estimated.
+
+        Args:
+            caller: Name used to schedule concurrent callers fairly
+            budget: Optional TokenBudget the call is charged to
+            priority: INTERACTIVE for user-facing calls, BACKGROUND otherwise
+            cancel_token: Optional CancellationToken, also checked between streamed chunks
+            timeout: Optional timeout for each attempt (seconds), passed to the client
+            **request: Chat completion arguments
+
+        Yields:
+            str: Completion text deltas
+
+        Raises:
+            Cancelled: If the call was cancelled or ran past its deadline
+        """
+        if self.client is None:
+            raise RuntimeError("OpenAI client not available")
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        estimated_tokens = self.estimate_tokens(request)
+        if budget is not None:
+            try:
+                budget.reserve(estimated_tokens)
+            except BudgetExhausted:
+                self._count("budget_rejections")
+                raise
+
+        prompt_tokens = estimated_tokens - request.get("max_tokens", 256)
+        completion_chars = 0
+        attempt = 0
+        try:
+            while True:
+                self._acquire(caller, priority, estimated_tokens, cancel_token)
+                error = None
+                try:
+                    self._count("requests")
+                    for chunk in self.client.chat.completions.create(
+                            stream=True, **request, **self._timeout_argument(cancel_token, timeout)):
+                        if cancel_token is not None:
+                            cancel_token.check()
+                        text = chunk.choices[0].delta.content if chunk.choices else None
+                        if text:
+                            completion_chars += len(text)
+                            yield text
+                except Exception as e:
+                    error = e
+                finally:
+                    self._release(priority)
+                    used_tokens = prompt_tokens + completion_chars // 4 if completion_chars else 0
+                    self._reconcile(estimated_tokens, used_tokens)
+
+                if error is None:
+                    self._count("tokens_used", used_tokens)
+                    return
+
+                if (completion_chars or attempt >= self.max_retries or isinstance(error, Cancelled)
+                        or not self._is_retryable(error, timeout)):
+                    self._count("failures")
+                    raise error
+
+                delay = self._backoff_delay(attempt, error)
+                attempt += 1
+                self._count("retries")
+                print(f"LLM stream failed ({error}), retrying in {delay:.1f}s (attempt {attempt}/{self.max_retries})")
+                self._sleep(delay, cancel_token)
+        finally:
+            if budget is not None:
+                budget.settle(estimated_tokens, prompt_tokens + completion_chars // 4 if completion_chars else 0)
+
+    def _acquire(self, caller, priority, tokens, cancel_token=None):
+        """Wait for this call's turn, a free slot in its priority class and rate limit capacity
+
+        Args:
+            caller: Caller name
+            priority: Priority class of the call
+            tokens: Estimated tokens for the call
+            cancel_token: Optional CancellationToken that ends the wait
+
+        Raises:
+            Cancelled: If the call is cancelled while waiting
+        """
+        # Waits are capped while cancellable so a cancelled call leaves the queue promptly
+        max_wait = self.cancel_poll_interval if cancel_token is not None else None
+
+        with self._condition:
+            waiter = {"caller": caller, "priority": priority, "sequence": next(self._sequence)}
+            self._waiters.append(waiter)
+            wait_start = time.monotonic()
+            try:
+                while True:
+                    if cancel_token is not None:
+                        cancel_token.check()
+
+                    if self._next_waiter() is waiter:
+                        now = time.monotonic()
+                        delay = max(self._request_bucket.wait_time(1, now),
+                                    self._token_bucket.wait_time(tokens, now))
+                        if delay <= 0:
+                            self._request_bucket.consume(1, now)
+                            self._token_bucket.consume(tokens, now)
+                            self._last_served[caller] = waiter["sequence"]
+                            self._in_flight[priority] += 1
+                            self._queue_waits[priority].append(now - wait_start)
+                            self.stats["throttle_wait"] += now - wait_start
+                            return
+                        self._condition.wait(min(delay, max_wait) if max_wait else delay)
+                    else:
+                        self._condition.wait(max_wait)
+            finally:
+                self._waiters.remove(waiter)
+                self._condition.notify_all()
+
+    def _release(self, priority):
+        """Free the slot a call held in its priority class"""
+        with self._condition:
+            self._in_flight[priority] -= 1
+            self._condition.notify_all()
+
+    def _next_waiter(self):
+        """Pick the next waiter to admit
+
+        Only waiters whose priority class is below its concurrency cap are eligible.
+        Interactive waiters go first, then the caller served longest ago, then the
+        oldest request.
+
+        Returns:
+            dict: The waiter to admit, or None if no class has a free slot
+        """
+        eligible = [w for w in self._waiters
+                    if self._in_flight[w["priority"]] < self.concurrency_limits[w["priority"]]]
+        if not eligible:
+            return None
+        return min(eligible, key=lambda w: (PRIORITIES.index(w["priority"]),
+                                            self._last_served.get(w["caller"], -1),
+                                            w["sequence"]))
+
+    def _count(self, stat, amount=1):
+        """Increment a statistics counter"""
+        with self._condition:
+            self.stats[stat] += amount
+
+    def _reconcile(self, estimated_tokens, used_tokens):
+        """Correct the token bucket once a call's actual usage is known"""
+        with self._condition:
+            self._token_bucket.refund(estimated_tokens - used_tokens, time.monotonic())
+            self._condition.notify_all()
+
+    def _timeout_argument(self, cancel_token, timeout):
+        """Client timeout for an attempt: the per-call timeout, cut short by the deadline
+
+        Returns:
+            dict: {"timeout": seconds}, or empty if neither limit applies
+        """
+        limits = [t for t in (timeout, cancel_token.remaining() if cancel_token else None) if t is not None]
+        if not limits:
+            return {}
+        return {"timeout": max(0.1, min(limits))}
+
+    def _sleep(self, seconds, cancel_token):
+        """Sleep between retries, waking early if the call is cancelled"""
+        if cancel_token is not None:
+            cancel_token.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+    def _is_retryable(self, error, timeout=None):
+        """Whether an error is worth retrying (rate limits, server errors, connection problems)
+
+        A timeout is not retried when the caller set one, so a call is not allowed to run
+        for several times the timeout it asked for.
+        """
+        if isinstance(error, openai.APITimeoutError):
+            return timeout is None
+        if isinstance(error, openai.APIConnectionError):
+            return True
+        status_code = getattr(error, "status_code", None)
+        return status_code is not None and (status_code == 429 or status_code >= 500)
+
+    def _without_client_retries(self, client):
+        """Turn off the OpenAI client's own retries, so they happen in the gateway only"""
+        if client is None or not hasattr(client, "with_options"):
+            return client
+        try:
+            return client.with_options(max_retries=0)
+        except Exception as e:
+            print(f"Could not disable client retries: {e}")
+            return client
+
+    def _backoff_delay(self, attempt, error):
+        """Exponential backoff with full jitter, honouring a Retry-After header if sent"""
+        delay = random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, min(self.max_backoff, float(retry_after)))
+            except ValueError:
+                pass
+
+        return delay
+
+    def estimate_tokens(self, request):
+        """Token estimate for a request: estimated prompt tokens plus the completion limit
+
+        Args:
+            request: Chat completion arguments
+
+        Returns:
+            int: Estimated tokens
+        """
+        prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in request.get("messages", []))
+        return prompt_tokens + request.get("max_tokens", 256)
+
+    def _response_tokens(self, response, estimated_tokens):
+        """Tokens reported by a response, falling back to the estimate"""
+        usage = getattr(response, "usage", None)
+        total_tokens = getattr(usage, "total_tokens", None)
+        return total_tokens if total_tokens is not None else estimated_tokens
+
+    def headroom(self):
+        """Fraction of the request and token rate limits currently available
+
+        Returns:
+            float: The smaller of the two bucket fill ratios (0-1)
+        """
+        with self._condition:
+            now = time.monotonic()
+            return min(self._request_bucket.fill_ratio(now), self._token_bucket.fill_ratio(now))
+
+    def get_stats(self):
+        """Get gateway statistics
+
+        Returns:
+            dict: Request, retry, failure and token counters, plus calls queued and in
+                flight and queue-wait percentiles for each priority class
+        """
+        with self._condition:
+            stats = dict(self.stats)
+            stats["queued"] = len(self._waiters)
+            stats["coalescing"] = self._single_flight.get_stats()
+            stats["priorities"] = {}
+            for priority in PRIORITIES:
+                waits = sorted(self._queue_waits[priority])
+                stats["priorities"][priority] = {
+                    "queued": sum(1 for w in self._waiters if w["priority"] == priority),
+                    "in_flight": self._in_flight[priority],
+                    "queue_wait_p50": waits[int(len(waits) * 0.5)] if waits else 0.0,
+                    "queue_wait_p99": waits[min(len(waits) - 1, int(len(waits) * 0.99))] if waits else 0.0,
+                    "queue_wait_max": waits[-1] if waits else 0.0
+                }
+            return stats
+
+
+class JsonArrayStream:
+    def __init__(self):
+        """Incremental parser for a streamed JSON array of objects
+
+        Text is fed in as it arrives and each top-level object is returned as soon as its
+        closing brace is seen. Anything outside the objects (brackets, commas, code fences,
+        prose) is ignored.
+        """
+        self.text = ""
+        self._position = 0
+        self._depth = 0
+        self._start = None
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text):
+        """Add streamed text and return the objects it completed
+
+        Args:
+            text: Next chunk of streamed text
+
+        Returns:
+            list: Objects completed by this chunk
+        """
+        self.text += text
+        objects = []
+
+        while self._position < len(self.text):
+            char = self.text[self._position]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"' and self._depth > 0:
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._start = self._position
+                self._depth += 1
+            elif char == "}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        objects.append(json.loads(self.text[self._start:self._position + 1]))
+                    except json.JSONDecodeError as e:
+                        print(f"Skipping malformed streamed object: {e}")
+                    self._start = None
+
+            self._position += 1
+
+        return objects
@@ -1,7 +1,15 @@
 import time
 import random
+import threading
+import uuid
 from datetime import datetime
 
+import numpy as np
+
+from emotion_dynamics import EMOTIONS, impact_vector
+from single_flight import SingleFlight
+from versioned_snapshot import VersionedSnapshot
+
 # Try to import embedding dependencies with better error handling
 EMBEDDINGS_AVAILABLE = False
 try:
@@ -17,13 +25,35 @@ except (ImportError, ValueError) as e:
 
 class MemorySystem:
     def __init__(self, embedding_model_name="all-MiniLM-L6-v2"):
-        """Initialize the memory system with an embedding model for semantic search"""
+        """Initialize the memory system with an embedding model for semantic search
+
+        The memory lists are copy-on-write: writers build a new list under write_lock and
+        publish it with a single assignment, so readers take the current list and iterate
+        it without locking. Counters and flags on individual memories (recall_count,
+        processed) are only changed under write_lock.
+        """
+        self.write_lock = threading.RLock()  # Serializes all mutations
+        self.version = 0  # Bumped by every mutation, so cached snapshots know when to rebuild
         self.memories = []
         self.consolidated_memories = []
         self.insights = []
         self.memory_id_counter = 0
+        self.revision = 0  # Change watermark - bumped whenever a memory is added, never reset
+        # Identifies this store's ids and revisions, which start again from 0 in a new process
+        # or after reset, so state saved against an older store can be recognized
+        self.generation = uuid.uuid4().hex
+        self.memory_added = threading.Event()  # Set whenever a memory is added, for waiting schedulers
         self.embedding_model = None
         self.embeddings_enabled = False
+        self.embedding_flight = SingleFlight()  # Shares identical in-flight encode calls
+
+        # Emotion vectors (and unit-length embeddings) of the emotion-tagged memories, rebuilt
+        # when the memory list is replaced
+        self._emotion_index = (None, [], np.zeros((0, len(EMOTIONS))), None)
+
+        # Cached display snapshot served to pollers, rebuilt only when the version changes
+        self.snapshot_limits = {"regular": 20, "consolidated": 10, "insights": 10}
+        self.snapshot = VersionedSnapshot(self._build_snapshot)
 
         # Try to load embedding model if dependencies are available
         if EMBEDDINGS_AVAILABLE:
@@ -35,7 +65,18 @@ class MemorySystem:
                 print(f"Could not load embedding model: {e}")
                 print("Running without semantic memory search")
 
-    def add_memory(self, text, source="conversation", importance=None, metadata=None):
+    def _encode(self, text):
+        """Create an embedding, sharing the result of an identical encode already in flight
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            The embedding vector
+        """
+        return self.embedding_flight.do(text, lambda: self.embedding_model.encode(text))
+
+    def add_memory(self, text, source="conversation", importance=None, metadata=None, emotions=None):
         """Add a regular memory to the system
 
         Args:
@@ -43,6 +84,7 @@ class MemorySystem:
             source: Source of the memory (conversation, dream, etc.)
             importance: Importance score (0-1). If None, it will be calculated.
             metadata: Additional metadata for the memory
+            emotions: Optional dict of emotion name to intensity (0-1) felt at the time
 
         Returns:
             dict: The created memory object
@@ -51,7 +93,7 @@ class MemorySystem:
         embedding = None
         if self.embeddings_enabled:
             try:
-                embedding = self.embedding_model.encode(text)
+                embedding = self._encode(text)
             except Exception as e:
                 print(f"Error creating embedding: {e}")
 
@@ -59,34 +101,43 @@ class MemorySystem:
         if importance is None:
             importance = self._calculate_importance(text, source)
 
-        # Generate a unique ID
-        self.memory_id_counter += 1
-        memory_id = self.memory_id_counter
-
-        # Create memory entry
-        memory = {
-            "id": memory_id,
-            "text": text,
-            "source": source,
-            "embedding": embedding,
-            "timestamp": time.time(),
-            "formatted_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            "importance": importance,
-            "metadata": metadata or {},
-            "recall_count": 0,
-            "processed": False  # Flag for dream processing
-        }
-
-        # Store in memories collection
-        self.memories.append(memory)
-
-        # Keep memory size manageable
-        if len(self.memories) > 100:
-            # Sort by recency and recall count (keep frequently accessed)
-            self.memories.sort(key=lambda x: x["timestamp"] + (x["recall_count"] * 86400))
-            # Keep most recent/important
-            self.memories = self.memories[-100:]
-
+        with self.write_lock:
+            # Generate a unique ID
+            self.memory_id_counter += 1
+            memory_id = self.memory_id_counter
+            self.revision += 1
+
+            # Create memory entry
+            memory = {
+                "id": memory_id,
+                "text": text,
+                "source": source,
+                "embedding": embedding,
+                "timestamp": time.time(),
+                "formatted_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                "importance": importance,
+                "metadata": metadata or {},
+                "recall_count": 0,
+                "processed": False,  # Flag for dream processing
+                "revision": self.revision  # Change watermark when the memory was added
+            }
+            if emotions:
+                memory["emotions"] = {emotion: float(emotions.get(emotion, 0.0)) for emotion in EMOTIONS}
+
+            # Store in memories collection
+            memories = self.memories + [memory]
+
+            # Keep memory size manageable
+            if len(memories) > 100:
+                # Sort by recency and recall count (keep frequently accessed)
+                memories.sort(key=lambda x: x["timestamp"] + (x["recall_count"] * 86400))
+                # Keep most recent/important
+                memories = memories[-100:]
+
+            self.memories = memories
+            self.version += 1
+
+        self.memory_added.set()
         return memory
 
     def add_consolidated_memory(self, text, importance=0.7, metadata=None):
@@ -100,31 +151,35 @@ class MemorySystem:
         Returns:
             dict: The created consolidated memory object
         """
-        # Generate a unique ID
-        self.memory_id_counter += 1
-        memory_id = self.memory_id_counter
-
-        # Create consolidated memory entry
-        memory = {
-            "id": memory_id,
-            "text": text,
-            "source": "consolidated",
-            "timestamp": time.time(),
-            "formatted_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            "importance": importance,
-            "metadata": metadata or {},
-            "recall_count": 0
-        }
-
-        # Store in consolidated memories collection
-        self.consolidated_memories.append(memory)
-
-        # Keep memory size manageable
-        if len(self.consolidated_memories) > 50:
-            # Sort by importance (keep most important)
-            self.consolidated_memories.sort(key=lambda x: x["importance"], reverse=True)
-            # Keep most important
-            self.consolidated_memories = self.consolidated_memories[-50:]
+        with self.write_lock:
+            # Generate a unique ID
+            self.memory_id_counter += 1
+            memory_id = self.memory_id_counter
+
+            # Create consolidated memory entry
+            memory = {
+                "id": memory_id,
+                "text": text,
+                "source": "consolidated",
+                "timestamp": time.time(),
+                "formatted_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                "importance": importance,
+                "metadata": metadata or {},
+                "recall_count": 0
+            }
+
+            # Store in consolidated memories collection
+            consolidated_memories = self.consolidated_memories + [memory]
+
+            # Keep memory size manageable
+            if len(consolidated_memories) > 50:
+                # Sort by importance (keep most important)
+                consolidated_memories.sort(key=lambda x: x["importance"], reverse=True)
+                # Keep most important
+                consolidated_memories = consolidated_memories[-50:]
+
+            self.consolidated_memories = consolidated_memories
+            self.version += 1
 
         return memory
 
@@ -139,31 +194,35 @@ class MemorySystem:
         Returns:
             dict: The created insight object
         """
-        # Generate a unique ID
-        self.memory_id_counter += 1
-        memory_id = self.memory_id_counter
-
-        # Create insight entry
-        insight = {
-            "id": memory_id,
-            "text": text,
-            "source": "insight",
-            "timestamp": time.time(),
-            "formatted_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            "importance": importance,
-            "metadata": metadata or {},
-            "recall_count": 0
-        }
-
-        # Store in insights collection
-        self.insights.append(insight)
-
-        # Keep insights size manageable
-        if len(self.insights) > 30:
-            # Sort by importance (keep most important)
-            self.insights.sort(key=lambda x: x["importance"], reverse=True)
-            # Keep most important
-            self.insights = self.insights[-30:]
+        with self.write_lock:
+            # Generate a unique ID
+            self.memory_id_counter += 1
+            memory_id = self.memory_id_counter
+
+            # Create insight entry
+            insight = {
+                "id": memory_id,
+                "text": text,
+                "source": "insight",
+                "timestamp": time.time(),
+                "formatted_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                "importance": importance,
+                "metadata": metadata or {},
+                "recall_count": 0
+            }
+
+            # Store in insights collection
+            insights = self.insights + [insight]
+
+            # Keep insights size manageable
+            if len(insights) > 30:
+                # Sort by importance (keep most important)
+                insights.sort(key=lambda x: x["importance"], reverse=True)
+                # Keep most important
+                insights = insights[-30:]
+
+            self.insights = insights
+            self.version += 1
 
         return insight
 
@@ -202,13 +261,14 @@ class MemorySystem:
 
         # Similarity factor (if embeddings enabled)
         similarity_factor = 0.0
-        if self.embeddings_enabled and self.memories:
+        memories = self.memories
+        if self.embeddings_enabled and memories:
             try:
                 # Get embedding for this text
-                new_embedding = self.embedding_model.encode(text)
+                new_embedding = self._encode(text)
 
                 # Find similarity to most important existing memories
-                important_memories = sorted(self.memories, key=lambda x: x.get("importance", 0), reverse=True)[:5]
+                important_memories = sorted(memories, key=lambda x: x.get("importance", 0), reverse=True)[:5]
                 for memory in important_memories:
                     if memory.get("embedding") is not None:
                         similarity = cosine_similarity(
@@ -228,28 +288,48 @@ class MemorySystem:
         # Ensure it's in the 0-1 range
         return max(0.1, min(0.95, importance))
 
-    def find_related_memories(self, text, threshold=0.6, max_results=3):
+    def encode_query(self, text):
+        """Embed a query once so several lookups can share it
+
+        Args:
+            text: Query text
+
+        Returns:
+            The embedding vector, or None if embeddings are unavailable or encoding failed
+        """
+        if not self.embeddings_enabled:
+            return None
+        try:
+            return self._encode(text)
+        except Exception as e:
+            print(f"Error creating query embedding: {e}")
+            return None
+
+    def find_related_memories(self, text, threshold=0.6, max_results=3, query_embedding=None):
         """Find memories semantically related to the given text
 
         Args:
             text: Query text
             threshold: Minimum similarity threshold
             max_results: Maximum number of results to return
+            query_embedding: Optional embedding of text from encode_query, to skip encoding
 
         Returns:
             list: Matching memories with similarity scores
         """
-        if not self.embeddings_enabled or not self.memories:
+        memories = self.memories
+        if not self.embeddings_enabled or not memories:
             # Fall back to keyword matching if embeddings not available
             return self._find_related_by_keywords(text, max_results)
 
         # Create query embedding
         try:
-            query_embedding = self.embedding_model.encode(text)
+            if query_embedding is None:
+                query_embedding = self._encode(text)
 
             # Compare with stored memories
             results = []
-            for memory in self.memories:
+            for memory in memories:
                 if memory["embedding"] is not None:
                     similarity = cosine_similarity(
                         [query_embedding],
@@ -263,8 +343,7 @@ class MemorySystem:
             results.sort(key=lambda x: x[1], reverse=True)
 
             # Update recall count for retrieved memories
-            for memory, _ in results[:max_results]:
-                memory["recall_count"] += 1
+            self._count_recalls(results[:max_results])
 
             return results[:max_results]
 
@@ -273,6 +352,102 @@ class MemorySystem:
             # Fall back to keyword matching if embeddings fail
             return self._find_related_by_keywords(text, max_results)
 
+    def find_emotional_memories(self, text, query_embedding=None, emotions=None, emotion_weight=0.5,
+                                threshold=0.3, max_results=3):
+        """Find emotion-tagged memories related to the text, optionally favoring similar moods
+
+        Scores every emotion-tagged memory at once by text similarity (cosine similarity of
+        embeddings, or keyword overlap without embeddings). Memories similar enough to the
+        text are then ranked by that similarity blended with how close the memory's
+        emotions are to the given emotional state, so mood only re-ranks related memories
+        and never recalls an unrelated one on its own.
+
+        Args:
+            text: Query text
+            query_embedding: Optional embedding of text from encode_query, to skip encoding
+            emotions: Optional dict of the current emotion intensities. If given, memories
+                felt in a similar state score higher (mood-congruent recall).
+            emotion_weight: Share of the score given to emotional proximity (0-1)
+            threshold: Minimum text similarity
+            max_results: Maximum number of results to return
+
+        Returns:
+            list: (memory, score) pairs, best first
+        """
+        tagged, emotion_matrix, embedding_matrix = self._get_emotion_index()
+        if not tagged:
+            return []
+
+        text_scores = None
+        if self.embeddings_enabled and embedding_matrix is not None:
+            try:
+                if query_embedding is None:
+                    query_embedding = self._encode(text)
+                query = np.asarray(query_embedding, dtype=float)
+                text_scores = embedding_matrix @ (query / (np.linalg.norm(query) or 1.0))
+            except Exception as e:
+                print(f"Error scoring emotional memories: {e}")
+        if text_scores is None:
+            words = set(text.lower().split())
+            text_scores = np.array([self._keyword_similarity(words, memory["text"]) for memory in tagged])
+
+        candidates = np.flatnonzero(text_scores >= threshold)
+        if not len(candidates):
+            return []
+
+        scores = text_scores
+        if emotions:
+            # Distance between emotion vectors, scaled so identical states score 1 and opposite corners 0
+            state = impact_vector(emotions)
+            proximity = 1.0 - np.linalg.norm(emotion_matrix - state, axis=1) / np.sqrt(len(EMOTIONS))
+            scores = (1.0 - emotion_weight) * text_scores + emotion_weight * proximity
+
+        if len(candidates) > max_results:
+            candidates = candidates[np.argpartition(-scores[candidates], max_results - 1)[:max_results]]
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        results = [(tagged[i], float(scores[i])) for i in candidates]
+        self._count_recalls(results)
+        return results
+
+    def _get_emotion_index(self):
+        """Get the emotion-tagged memories with their emotion and embedding matrices
+
+        Returns:
+            tuple: (memories, emotion matrix, unit-length embedding matrix or None). Rows of
+                the matrices follow the memory list. Memories without an embedding get a
+                zero row.
+        """
+        memories = self.memories
+        index = self._emotion_index
+        if index[0] is memories:
+            return index[1:]
+
+        tagged = [memory for memory in memories if memory.get("emotions")]
+        emotion_matrix = np.array([[memory["emotions"][emotion] for emotion in EMOTIONS] for memory in tagged])
+        emotion_matrix = emotion_matrix.reshape(len(tagged), len(EMOTIONS))
+
+        embedding_matrix = None
+        embedded = [memory["embedding"] for memory in tagged if memory["embedding"] is not None]
+        if embedded:
+            dims = len(embedded[0])
+            embedding_matrix = np.array([memory["embedding"] if memory["embedding"] is not None else np.zeros(dims)
+                                         for memory in tagged], dtype=float)
+            norms = np.linalg.norm(embedding_matrix, axis=1, keepdims=True)
+            embedding_matrix /= np.where(norms > 0, norms, 1.0)
+
+        self._emotion_index = (memories, tagged, emotion_matrix, embedding_matrix)
+        return tagged, emotion_matrix, embedding_matrix
+
+    def _keyword_similarity(self, words, text):
+        """Word overlap between a query's word set and a text, 0 unless above 0.1"""
+        memory_words = set(text.lower().split())
+        common_words = words.intersection(memory_words)
+        if not common_words:
+            return 0.0
+        similarity = len(common_words) / max(len(words), len(memory_words))
+        return similarity if similarity > 0.1 else 0.0
+
     def _find_related_by_keywords(self, text, max_results=3):
         """Simple keyword-based memory retrieval as fallback
 
@@ -283,14 +458,15 @@ class MemorySystem:
         Returns:
             list: Matching memories with similarity scores
         """
-        if not self.memories:
+        memories = self.memories
+        if not memories:
             return []
 
         # Simple keyword matching as fallback
         words = set(text.lower().split())
         results = []
 
-        for memory in self.memories:
+        for memory in memories:
             memory_words = set(memory["text"].lower().split())
             common_words = words.intersection(memory_words)
 
@@ -304,20 +480,43 @@ class MemorySystem:
         results.sort(key=lambda x: x[1], reverse=True)
 
         # Update recall count for retrieved memories
-        for memory, _ in results[:max_results]:
-            memory["recall_count"] += 1
+        self._count_recalls(results[:max_results])
 
         return results[:max_results]
 
-    def find_similar_memories(self, similarity_threshold=0.65):
+    def _count_recalls(self, results):
+        """Increment the recall count of retrieved memories
+
+        Args:
+            results: (memory, similarity) pairs that were retrieved
+        """
+        # Most lookups find nothing, and must not invalidate the cached memory snapshot
+        if not results:
+            return
+        with self.write_lock:
+            for memory, _ in results:
+                memory["recall_count"] += 1
+            self.version += 1
+
+    def find_similar_memories(self, similarity_threshold=0.65, since_revision=None):
         """Find groups of similar memories for consolidation
 
+        Args:
+            similarity_threshold: Minimum similarity for memories to be grouped
+            since_revision: If given, only return groups that touch a memory added after
+                this revision. Similarity is then only computed for the new memories,
+                so the cost follows new activity rather than store size.
+
         Returns:
             list: Lists of similar memories grouped together
         """
-        if not self.memories or len(self.memories) < 2:
+        memories = self.memories
+        if len(memories) < 2:
             return []
 
+        def is_changed(memory):
+            return since_revision is None or memory.get("revision", 0) > since_revision
+
         # Method 1: Use embeddings if available
         if self.embeddings_enabled:
             try:
@@ -325,7 +524,7 @@ class MemorySystem:
                 memory_embeddings = []
                 valid_memories = []
 
-                for memory in self.memories:
+                for memory in memories:
                     if memory["embedding"] is not None and not memory.get("processed", False):
                         memory_embeddings.append(memory["embedding"])
                         valid_memories.append(memory)
@@ -333,25 +532,35 @@ class MemorySystem:
                 if not valid_memories:
                     return []
 
-                # Calculate similarity matrix
-                similarity_matrix = cosine_similarity(memory_embeddings)
+                # Only the changed memories seed new groups
+                seed_indices = [i for i, memory in enumerate(valid_memories) if is_changed(memory)]
+                if not seed_indices:
+                    return []
+
+                # Calculate similarity of each seed against every candidate
+                similarity_matrix = cosine_similarity(
+                    [memory_embeddings[i] for i in seed_indices],
+                    memory_embeddings
+                )
 
                 # Find groups of similar memories
                 similar_groups = []
                 processed_indices = set()
 
-                for i in range(len(valid_memories)):
+                for row, i in enumerate(seed_indices):
                     if i in processed_indices:
                         continue
 
                     group = [valid_memories[i]]
                     processed_indices.add(i)
 
-                    for j in range(i + 1, len(valid_memories)):
+                    # A full scan only needs to look forward, as earlier memories were seeds already
+                    start = i + 1 if since_revision is None else 0
+                    for j in range(start, len(valid_memories)):
                         if j in processed_indices:
                             continue
 
-                        if similarity_matrix[i][j] >= similarity_threshold:
+                        if similarity_matrix[row][j] >= similarity_threshold:
                             group.append(valid_memories[j])
                             processed_indices.add(j)
 
@@ -368,8 +577,8 @@ class MemorySystem:
         similar_groups = []
         processed_ids = set()
 
-        for memory in self.memories:
-            if memory.get("id") in processed_ids or memory.get("processed", False):
+        for memory in memories:
+            if memory.get("id") in processed_ids or memory.get("processed", False) or not is_changed(memory):
                 continue
 
             metadata = memory.get("metadata", {})
@@ -380,7 +589,7 @@ class MemorySystem:
                 group = [memory]
                 processed_ids.add(memory.get("id"))
 
-                for other_memory in self.memories:
+                for other_memory in memories:
                     if other_memory.get("id") in processed_ids or other_memory.get("processed", False):
                         continue
 
@@ -394,8 +603,9 @@ class MemorySystem:
 
         # Method 3: Check for same event_type in metadata
         event_type_groups = {}
+        changed_event_types = set()
 
-        for memory in self.memories:
+        for memory in memories:
             if memory.get("id") in processed_ids or memory.get("processed", False):
                 continue
 
@@ -409,9 +619,12 @@ class MemorySystem:
                 event_type_groups[event_type].append(memory)
                 processed_ids.add(memory.get("id"))
 
+                if is_changed(memory):
+                    changed_event_types.add(event_type)
+
         # Add groups with more than one memory
         for event_type, group in event_type_groups.items():
-            if len(group) > 1:
+            if len(group) > 1 and event_type in changed_event_types:
                 similar_groups.append(group)
 
         return similar_groups
@@ -428,9 +641,10 @@ class MemorySystem:
         Returns:
             list: Filtered memories
         """
+        memories = self.memories
         filtered = []
 
-        for memory in self.memories:
+        for memory in memories:
             importance = memory.get("importance", 0)
 
             if ((min_importance is None or importance >= min_importance) and
@@ -447,12 +661,35 @@ class MemorySystem:
         # If we don't have enough memories, relax the importance criteria
         if min_count and len(filtered) < min_count:
             needed = min_count - len(filtered)
-            remaining = [m for m in self.memories if m not in filtered]
+            remaining = [m for m in memories if m not in filtered]
             remaining.sort(key=lambda x: x.get("importance", 0), reverse=True)
             filtered.extend(remaining[:needed])
 
         return filtered
 
+    def get_memories_since(self, revision):
+        """Get memories added after the given change watermark
+
+        Args:
+            revision: Watermark from a previous read of self.revision
+
+        Returns:
+            list: Memories added since the watermark, oldest first
+        """
+        return [m for m in self.memories if m.get("revision", 0) > revision]
+
+    def get_memories_by_ids(self, memory_ids):
+        """Get memories by their ids
+
+        Args:
+            memory_ids: Ids of the memories to get
+
+        Returns:
+            list: Memories that still exist, in the order of memory_ids
+        """
+        by_id = {m["id"]: m for m in self.memories}
+        return [by_id[memory_id] for memory_id in memory_ids if memory_id in by_id]
+
     def get_unprocessed_memories(self):
         """Get memories that haven't been processed by the dream system
 
@@ -467,9 +704,11 @@ class MemorySystem:
         Args:
             memory_ids: List of memory IDs to mark as processed
         """
-        for memory in self.memories:
-            if memory.get("id") in memory_ids:
-                memory["processed"] = True
+        with self.write_lock:
+            for memory in self.memories:
+                if memory.get("id") in memory_ids:
+                    memory["processed"] = True
+            self.version += 1
 
     def get_recent_memories(self, max_count=10):
         """Get the most recent memories
@@ -512,9 +751,44 @@ class MemorySystem:
             return self.insights[:max_count]
         return self.insights
 
+    def get_snapshot(self):
+        """Get a cached snapshot of the memories shown in the UI
+
+        Returns:
+            dict: Version plus recent regular memories, consolidated memories and
+                insights, without embeddings. Must not be modified.
+        """
+        return self.snapshot.get(self.version)
+
+    def get_snapshot_json(self):
+        """Get the cached UI snapshot serialized as JSON
+
+        Returns:
+            bytes: UTF-8 JSON of get_snapshot()
+        """
+        return self.snapshot.get_json(self.version)
+
+    def _build_snapshot(self):
+        """Build the UI snapshot of the current memories"""
+        version = self.version
+
+        def public(memory):
+            return {key: value for key, value in memory.items() if key != "embedding"}
+
+        return {
+            "version": version,
+            "regular": [public(m) for m in self.get_recent_memories(max_count=self.snapshot_limits["regular"])],
+            "consolidated": [public(m) for m in
+                             self.get_consolidated_memories(max_count=self.snapshot_limits["consolidated"])],
+            "insights": [public(m) for m in self.get_insights(max_count=self.snapshot_limits["insights"])]
+        }
+
     def reset(self):
         """Reset the memory system"""
-        self.memories = []
-        self.consolidated_memories = []
-        self.insights = []
-        self.memory_id_counter = 0
\ No newline at end of file
+        with self.write_lock:
+            self.memories = []
+            self.consolidated_memories = []
+            self.insights = []
+            self.memory_id_counter = 0
+            self.generation = uuid.uuid4().hex
+            self.version += 1
\ No newline at end of file
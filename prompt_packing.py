@@ -0,0 +1,98 @@
+import re
+
+# Try to use the OpenAI tokenizer for exact counts, falling back to a local estimate
+TOKENIZER_AVAILABLE = False
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("cl100k_base")
+    TOKENIZER_AVAILABLE = True
+except Exception:
+    _encoding = None
+
+# Words, numbers and individual punctuation marks - roughly how BPE tokenizers split English text
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    """Estimate how many tokens a text uses
+
+    Uses tiktoken when installed. Otherwise every word or punctuation mark counts as
+    one token, plus one more for every 6 characters of longer words.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return sum(1 + (len(piece) - 1) // 6 for piece in _TOKEN_PATTERN.findall(text))
+
+
+def trim_text(text, max_tokens):
+    """Trim a text to at most max_tokens, cutting at a word boundary
+
+    Args:
+        text: Text to trim
+        max_tokens: Token limit
+
+    Returns:
+        str: The text, shortened with "..." if it was over the limit
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    words = text.split()
+    kept = []
+    used = 1  # Room for the ellipsis
+    for word in words:
+        word_tokens = estimate_tokens(word)
+        if used + word_tokens > max_tokens:
+            break
+        kept.append(word)
+        used += word_tokens
+
+    return " ".join(kept) + "..."
+
+
+def pack_memories(memories, token_budget, max_item_tokens=None, line_prefix="- "):
+    """Pack memories into a token budget, most important per token first
+
+    Memory texts over max_item_tokens are trimmed first. Memories are then taken in
+    order of importance per token while they still fit in the budget.
+
+    Args:
+        memories: Candidate memories
+        token_budget: Tokens available for the packed lines
+        max_item_tokens: Optional limit on the tokens of a single memory
+        line_prefix: Prefix for each prompt line
+
+    Returns:
+        tuple: (packed memories, prompt lines, tokens used by the lines)
+    """
+    candidates = []
+    for memory in memories:
+        text = memory["text"]
+        if max_item_tokens:
+            text = trim_text(text, max_item_tokens)
+        line = f"{line_prefix}{text}"
+        tokens = estimate_tokens(line) + 1  # Newline between lines
+        candidates.append((memory.get("importance", 0.5) / tokens, memory, line, tokens))
+
+    candidates.sort(key=lambda c: c[0], reverse=True)
+
+    packed = []
+    lines = []
+    tokens_used = 0
+    for _, memory, line, tokens in candidates:
+        if tokens_used + tokens > token_budget:
+            continue
+        packed.append(memory)
+        lines.append(line)
+        tokens_used += tokens
+
+    return packed, lines, tokens_used
@@ -0,0 +1,81 @@
+import threading
+
+
+class _Call:
+    """An in-flight call and the result its waiters will share"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        """Deduplicate identical in-flight calls
+
+        The first caller for a key runs the function; callers arriving with the same key
+        while it runs wait for it and share its result (or exception). Nothing is cached
+        once the call finishes, so the next call for the key runs again.
+        """
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {
+            "calls": 0,  # Calls that actually ran
+            "coalesced": 0  # Calls that shared another call's result
+        }
+
+    def do(self, key, func, wait=None):
+        """Run func, or wait for an identical call already in flight
+
+        Args:
+            key: Hashable key identifying identical calls
+            func: Callable taking no arguments
+            wait: Optional callable a waiting caller uses instead of blocking on the
+                in-flight call's done event; it is given the event and may raise to stop
+                waiting (e.g. on cancellation)
+
+        Returns:
+            The result of func, shared by every caller with the same key
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.stats["calls"] += 1
+                leader = True
+
+        if not leader:
+            if wait:
+                wait(call.done)
+            else:
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def get_stats(self):
+        """Get coalescing counters
+
+        Returns:
+            dict: Calls that ran, calls coalesced and calls currently in flight
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self._calls)
+            return stats
@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class StageGraph:
+    """Dependency graph of processing stages run by a concurrent scheduler
+
+    Each stage is started as soon as all of the stages it depends on have finished,
+    so independent stages run at the same time and total latency follows the
+    critical path of the graph rather than the sum of all stages.
+    """
+
+    # Returned by a stage to stop the graph - stages that have not started yet are skipped
+    HALT = object()
+
+    def __init__(self):
+        """Initialize an empty stage graph"""
+        self.stages = {}
+
+    def add_stage(self, name, func, depends_on=()):
+        """Add a stage to the graph
+
+        Args:
+            name: Unique stage name
+            func: Callable receiving a dict of results from the stages it depends on
+            depends_on: Names of stages that must finish before this one starts
+        """
+        if name in self.stages:
+            raise ValueError(f"Stage already exists: {name}")
+
+        for dependency in depends_on:
+            if dependency not in self.stages:
+                raise ValueError(f"Stage {name} depends on unknown stage: {dependency}")
+
+        self.stages[name] = {
+            "func": func,
+            "depends_on": tuple(depends_on)
+        }
+
+    def run(self, max_workers=2):
+        """Run every stage in dependency order, running independent stages concurrently
+
+        If a stage returns HALT or raises, no further stages are started. Stages that
+        are already running are allowed to finish, then the exception (if any) is re-raised.
+
+        Args:
+            max_workers: Maximum number of stages running at the same time
+
+        Returns:
+            tuple: (results by stage name, name of the stage that halted the graph or None)
+        """
+        results = {}
+        halted_stage = None
+        error = None
+        pending = dict(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            while pending or running:
+                # Start every stage whose dependencies have all finished
+                if halted_stage is None and error is None:
+                    for name, stage in list(pending.items()):
+                        if all(dependency in results for dependency in stage["depends_on"]):
+                            inputs = {dependency: results[dependency] for dependency in stage["depends_on"]}
+                            running[executor.submit(stage["func"], inputs)] = name
+                            del pending[name]
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        if error is None:
+                            error = e
+                        continue
+
+                    if result is StageGraph.HALT:
+                        if halted_stage is None:
+                            halted_stage = name
+                        continue
+
+                    results[name] = result
+
+        if error is not None:
+            raise error
+
+        return results, halted_stage
@@ -26,6 +26,7 @@ document.addEventListener('DOMContentLoaded', function() {
     let insights = [];
     let dailyEvents = [];
     let currentDreamStage = 'idle';
+    let dreamsPolling = false;
     let dreamSequence = null;
     
     // Canvas context
@@ -161,9 +162,13 @@ document.addEventListener('DOMContentLoaded', function() {
                 console.log("Dream state poll response:", data);
                 updateDreamState(data);
                 
-                // Poll dreams if needed
+                // Poll dreams if needed, and keep following the dream state for streamed progress
                 if (data.dreaming) {
-                    pollDreams();
+                    if (!dreamsPolling) {
+                        dreamsPolling = true;
+                        pollDreams();
+                    }
+                    setTimeout(pollDreamState, 1000);
                 } else {
                     setTimeout(pollDreamState, 2000);
                 }
@@ -179,7 +184,7 @@ document.addEventListener('DOMContentLoaded', function() {
             .then(response => response.json())
             .then(data => {
                 console.log("Dreams poll response:", data);
-                updateDreams(data);
+                updateDreams(data.dreams);
                 
                 // Continue polling at faster rate if dreaming
                 setTimeout(pollDreams, 1000);
@@ -234,6 +239,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 setDreamStage(data.current_stage || 'idle');
             }
             
+            // Show scenarios and insights streamed in so far
+            updateDreamProgress(data.current_dream);
+            
             // Draw dreaming state
             drawDreamingState();
         } else {
@@ -751,6 +759,33 @@ document.addEventListener('DOMContentLoaded', function() {
         dreamNarration.innerHTML = narration;
     }
     
+    function updateDreamProgress(dream) {
+        if (!dreamNarration || !dream) return;
+        
+        const partialResults = (dream.partial_scenarios || []).map(s => s.scenario)
+            .concat((dream.partial_insights || []).map(i => i.text));
+        
+        let progressElement = dreamNarration.querySelector('.dream-progress');
+        if (partialResults.length === 0) {
+            if (progressElement) progressElement.remove();
+            return;
+        }
+        
+        if (!progressElement) {
+            progressElement = document.createElement('div');
+            progressElement.classList.add('dream-progress');
+            dreamNarration.appendChild(progressElement);
+        }
+        
+        progressElement.innerHTML = '';
+        partialResults.forEach(text => {
+            const itemElement = document.createElement('p');
+            itemElement.classList.add('narration-text');
+            itemElement.textContent = text;
+            progressElement.appendChild(itemElement);
+        });
+    }
+    
     // Canvas Drawing Functions
     function drawIdleDreamState() {
         if (!ctx) return;
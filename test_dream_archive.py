@@ -0,0 +1,65 @@
+import pytest
+
+from dream_archive import DreamArchive
+
+
+def make_archive(count):
+    archive = DreamArchive()
+    for dream_id in range(1, count + 1):
+        archive.save({
+            "id": dream_id,
+            "timestamp": 1000.0 + dream_id,
+            "early_termination": dream_id % 3 == 0,
+            "consolidations": [{"count": 2, "consolidated_text": f"memory {dream_id}", "source": "conversation",
+                                "original_memories": ["a", "b"]}],
+            "insights": [],
+            "stages": []
+        })
+    return archive
+
+
+def test_following_cursors_visits_every_record_once():
+    archive = make_archive(7)
+    seen = []
+    cursor = None
+    while True:
+        records, cursor = archive.list(limit=3, cursor=cursor)
+        seen.extend(record["id"] for record in records)
+        if cursor is None:
+            break
+    assert seen == [7, 6, 5, 4, 3, 2, 1]
+
+
+def test_last_full_page_has_no_cursor():
+    archive = make_archive(4)
+    records, cursor = archive.list(limit=2)
+    assert [r["id"] for r in records] == [4, 3] and cursor == 3
+    records, cursor = archive.list(limit=2, cursor=cursor)
+    assert [r["id"] for r in records] == [2, 1] and cursor is None
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_limits_below_one_are_rejected(limit):
+    with pytest.raises(ValueError):
+        make_archive(3).list(limit=limit)
+
+
+def test_filters_and_summaries():
+    archive = make_archive(6)
+    records, _ = archive.list(limit=10, early_termination=True)
+    assert [r["id"] for r in records] == [6, 3]
+
+    records, _ = archive.list(limit=10, since=1002.0, until=1004.0)
+    assert [r["id"] for r in records] == [3, 2]
+
+    summary = archive.list(limit=1)[0][0]
+    assert "original_memories" not in summary["consolidations"][0]
+    assert archive.get(6)["consolidations"][0]["original_memories"] == ["a", "b"]
+
+
+def test_saving_an_id_again_replaces_the_record():
+    archive = make_archive(2)
+    archive.save({"id": 2, "timestamp": 1002.0, "early_termination": True, "consolidations": []})
+    assert archive.count() == 2
+    assert archive.get(2)["early_termination"] is True
+    assert archive.next_id() == 3
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+from dream_system import DreamSystem
+from memory_system import MemorySystem
+
+
+class FakeClient:
+    def __init__(self):
+        """OpenAI client stand-in answering consolidation prompts instantly"""
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        self.calls += 1
+        message = SimpleNamespace(content=f"Consolidated memory {self.calls}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)],
+                               usage=SimpleNamespace(total_tokens=100))
+
+
+def make_dream_system(memory_count):
+    memory_system = MemorySystem()
+    memory_system.embeddings_enabled = False
+    for i in range(memory_count):
+        memory_system.add_memory(f"walked the dog again {i} " + "lorem ipsum dolor " * 6,
+                                 importance=0.2, metadata={"event_type": "walk"})
+
+    dream_system = DreamSystem(FakeClient(), memory_system)
+    dream_system.pacing_mode = "fast"
+    dream_system.planning_enabled = False
+    dream_system.incremental_dreaming = True
+    # Only part of the group fits each consolidation prompt
+    dream_system.prompt_token_budgets["consolidation"] = 150
+    dream_system._should_continue_dreaming = lambda *args, **kwargs: True
+    return dream_system
+
+
+def unprocessed_originals(memory_system):
+    return [m for m in memory_system.get_unprocessed_memories() if m["source"] == "conversation"]
+
+
+def test_incremental_cycles_pick_up_packing_leftovers():
+    dream_system = make_dream_system(12)
+    memory_system = dream_system.memory_system
+
+    dream_system.trigger_dream_cycle()
+    leftovers = unprocessed_originals(memory_system)
+    assert leftovers, "the prompt budget should leave part of the group for a later cycle"
+    assert dream_system.dream_watermark == 12
+
+    # No new memories - the leftovers sit below the watermark
+    dream_system.trigger_dream_cycle()
+    assert unprocessed_originals(memory_system) == []
+
+
+def test_prompt_tokens_are_only_recorded_for_issued_calls():
+    dream_system = make_dream_system(4)
+    dream_system.planning_enabled = True
+    dream_system.planner.should_call = lambda expected_value, estimated_tokens: False
+
+    result = dream_system.trigger_dream_cycle()
+    record = dream_system.archive.get(result["dream_id"])
+
+    assert dream_system.client.calls == 0
+    assert record.get("prompt_tokens", []) == []
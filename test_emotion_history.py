@@ -0,0 +1,64 @@
+import numpy as np
+
+from emotion_history import EmotionHistory, RingBuffer
+
+
+def test_ring_buffer_keeps_the_newest_samples_in_order():
+    buffer = RingBuffer(3, 1)
+    for t in range(5):
+        buffer.append(float(t), [t])
+    times, values = buffer.since()
+    assert times.tolist() == [2.0, 3.0, 4.0]
+    assert values[:, 0].tolist() == [2.0, 3.0, 4.0]
+    assert buffer.since(3.0)[0].tolist() == [3.0, 4.0]
+
+
+def test_tiers_average_each_closed_interval():
+    history = EmotionHistory(1, base_interval=0.5, base_capacity=10, tiers=((2.0, 5),))
+    for i in range(10):
+        history.append(i * 0.5, [float(i)])
+
+    resolution, times, values = history.get(resolution=2.0)
+    assert resolution == 2.0
+    # The interval starting at 4.0 is still open
+    assert times.tolist() == [0.0, 2.0]
+    assert values[:, 0].tolist() == [1.5, 5.5]
+
+
+def test_extend_matches_appending_one_by_one():
+    tiers = ((1.0, 20), (5.0, 4))
+    times = np.arange(0, 30, 0.25)
+    values = np.stack([np.sin(times), np.cos(times)], axis=1)
+
+    appended = EmotionHistory(2, base_interval=0.25, base_capacity=50, tiers=tiers)
+    for t, value in zip(times, values):
+        appended.append(t, value)
+
+    extended = EmotionHistory(2, base_interval=0.25, base_capacity=50, tiers=tiers)
+    extended.extend(times[:37], values[:37])
+    extended.extend(times[37:], values[37:])
+
+    for resolution in (0.25, 1.0, 5.0):
+        _, expected_times, expected_values = appended.get(resolution=resolution)
+        _, actual_times, actual_values = extended.get(resolution=resolution)
+        assert np.allclose(actual_times, expected_times)
+        assert np.allclose(actual_values, expected_values)
+
+
+def test_window_picks_the_finest_tier_covering_it():
+    history = EmotionHistory(1, base_interval=1.0, base_capacity=10, tiers=((10.0, 10), (60.0, 10)))
+    for t in range(200):
+        history.append(float(t), [1.0])
+    assert history.get(window=5)[0] == 1.0
+    assert history.get(window=50)[0] == 10.0
+    assert history.get(window=500)[0] == 60.0
+    assert history.get(window=5)[1].tolist() == [194.0, 195.0, 196.0, 197.0, 198.0, 199.0]
+
+
+def test_clear_removes_every_tier():
+    history = EmotionHistory(1, base_interval=1.0, base_capacity=10, tiers=((5.0, 10),))
+    for t in range(20):
+        history.append(float(t), [1.0])
+    history.clear()
+    for resolution in (1.0, 5.0):
+        assert len(history.get(resolution=resolution)[1]) == 0
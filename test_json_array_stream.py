@@ -0,0 +1,40 @@
+import json
+
+from llm_gateway import JsonArrayStream
+
+
+def feed_in_chunks(text, size):
+    """Feed text to a new parser size characters at a time, returning every object it produced"""
+    parser = JsonArrayStream()
+    objects = []
+    for i in range(0, len(text), size):
+        objects.extend(parser.feed(text[i:i + size]))
+    return objects
+
+
+def test_objects_are_returned_as_soon_as_they_close():
+    parser = JsonArrayStream()
+    assert parser.feed('[{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(': 2}') == [{"b": 2}]
+    assert parser.feed(']') == []
+
+
+def test_chunk_boundaries_do_not_matter():
+    items = [{"scenario": "what if", "probability": 0.5}, {"nested": {"list": [1, {"x": 2}]}}]
+    text = json.dumps(items)
+    for size in (1, 3, 7, len(text)):
+        assert feed_in_chunks(text, size) == items
+
+
+def test_braces_and_quotes_inside_strings_are_ignored():
+    items = [{"text": 'a } brace, a { brace and an escaped \\" quote'}, {"text": "\\\\"}]
+    assert feed_in_chunks(json.dumps(items), 2) == items
+
+
+def test_code_fences_and_prose_are_skipped():
+    text = 'Here you go:\n```json\n[{"a": 1},\n {"b": 2}]\n```\nHope that helps!'
+    assert feed_in_chunks(text, 5) == [{"a": 1}, {"b": 2}]
+
+
+def test_malformed_object_is_skipped():
+    assert feed_in_chunks('[{"a": }, {"b": 2}]', 4) == [{"b": 2}]
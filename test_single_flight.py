@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def run_concurrently(flight, key, func, callers):
+    """Start threads that each call flight.do once, collecting their results and errors"""
+    results = []
+    errors = []
+
+    def call():
+        try:
+            results.append(flight.do(key, func))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_until(condition, timeout=2.0):
+    """Poll condition until it holds or timeout seconds pass"""
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.001)
+    assert condition()
+
+
+def test_concurrent_calls_share_one_result():
+    entered = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        entered.set()
+        release.wait(2)
+        return "result"
+
+    flight = SingleFlight()
+    leader, leader_results, _ = run_concurrently(flight, "key", func, 1)
+    assert entered.wait(2)
+    followers, results, _ = run_concurrently(flight, "key", func, 3)
+    wait_until(lambda: flight.get_stats()["coalesced"] == 3)
+    release.set()
+    for thread in leader + followers:
+        thread.join(2)
+
+    assert len(calls) == 1
+    assert leader_results + results == ["result"] * 4
+    assert flight.get_stats() == {"calls": 1, "coalesced": 3, "in_flight": 0}
+
+
+def test_followers_get_the_leaders_exception():
+    entered = threading.Event()
+    release = threading.Event()
+
+    def func():
+        entered.set()
+        release.wait(2)
+        raise RuntimeError("failed")
+
+    flight = SingleFlight()
+    leader, _, leader_errors = run_concurrently(flight, "key", func, 1)
+    assert entered.wait(2)
+    followers, _, errors = run_concurrently(flight, "key", func, 2)
+    wait_until(lambda: flight.get_stats()["coalesced"] == 2)
+    release.set()
+    for thread in leader + followers:
+        thread.join(2)
+
+    assert [str(e) for e in leader_errors + errors] == ["failed"] * 3
+
+
+def test_calls_are_not_cached_once_finished():
+    flight = SingleFlight()
+    counter = iter(range(10))
+    assert flight.do("key", lambda: next(counter)) == 0
+    assert flight.do("key", lambda: next(counter)) == 1
+    assert flight.get_stats()["coalesced"] == 0
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight()
+    assert flight.do(("dream-cycle", "fast"), lambda: "fast") == "fast"
+    assert flight.do(("dream-cycle", "realtime"), lambda: "realtime") == "realtime"
+
+
+def test_wait_callback_can_stop_a_follower():
+    entered = threading.Event()
+    release = threading.Event()
+
+    def func():
+        entered.set()
+        release.wait(2)
+        return "result"
+
+    def give_up(done):
+        raise TimeoutError("stopped waiting")
+
+    flight = SingleFlight()
+    leader, leader_results, _ = run_concurrently(flight, "key", func, 1)
+    assert entered.wait(2)
+    with pytest.raises(TimeoutError):
+        flight.do("key", func, wait=give_up)
+    release.set()
+    leader[0].join(2)
+    assert leader_results == ["result"]
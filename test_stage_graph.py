@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+from stage_graph import StageGraph
+
+
+def test_stages_run_after_their_dependencies():
+    order = []
+    lock = threading.Lock()
+
+    def stage(name, result):
+        def run(inputs):
+            with lock:
+                order.append(name)
+            return result(inputs)
+        return run
+
+    graph = StageGraph()
+    graph.add_stage("a", stage("a", lambda inputs: 1))
+    graph.add_stage("b", stage("b", lambda inputs: inputs["a"] + 1), depends_on=["a"])
+    graph.add_stage("c", stage("c", lambda inputs: inputs["a"] + 2), depends_on=["a"])
+    graph.add_stage("d", stage("d", lambda inputs: inputs["b"] + inputs["c"]), depends_on=["b", "c"])
+
+    results, halted_stage = graph.run(max_workers=2)
+
+    assert results == {"a": 1, "b": 2, "c": 3, "d": 5}
+    assert halted_stage is None
+    assert order[0] == "a" and order[-1] == "d"
+
+
+def test_independent_stages_run_concurrently():
+    both_started = threading.Barrier(2, timeout=2)
+
+    def wait_for_other(inputs):
+        both_started.wait()  # Raises BrokenBarrierError if the stages ran one after another
+        return True
+
+    graph = StageGraph()
+    graph.add_stage("root", lambda inputs: None)
+    graph.add_stage("left", wait_for_other, depends_on=["root"])
+    graph.add_stage("right", wait_for_other, depends_on=["root"])
+
+    results, _ = graph.run(max_workers=2)
+    assert results["left"] and results["right"]
+
+
+def test_halt_skips_stages_not_yet_started():
+    ran = []
+    graph = StageGraph()
+    graph.add_stage("a", lambda inputs: StageGraph.HALT)
+    graph.add_stage("b", lambda inputs: ran.append("b"), depends_on=["a"])
+
+    results, halted_stage = graph.run()
+
+    assert halted_stage == "a"
+    assert results == {}
+    assert ran == []
+
+
+def test_error_lets_running_stages_finish_then_is_raised():
+    finished = []
+
+    def slow(inputs):
+        time.sleep(0.1)
+        finished.append("slow")
+        return "done"
+
+    def fail(inputs):
+        raise RuntimeError("cancelled")
+
+    graph = StageGraph()
+    graph.add_stage("slow", slow)
+    graph.add_stage("fail", fail)
+    graph.add_stage("after", lambda inputs: finished.append("after"), depends_on=["slow", "fail"])
+
+    with pytest.raises(RuntimeError, match="cancelled"):
+        graph.run(max_workers=2)
+    assert finished == ["slow"]
+
+
+def test_unknown_dependency_and_duplicate_stage_are_rejected():
+    graph = StageGraph()
+    graph.add_stage("a", lambda inputs: None)
+    with pytest.raises(ValueError):
+        graph.add_stage("a", lambda inputs: None)
+    with pytest.raises(ValueError):
+        graph.add_stage("b", lambda inputs: None, depends_on=["missing"])
@@ -0,0 +1,64 @@
+import json
+import threading
+
+
+class VersionedSnapshot:
+    def __init__(self, build):
+        """Cache of a state snapshot and its JSON, rebuilt only when the state's version changes
+
+        Readers compare versions without locking and get the cached snapshot back, so the
+        cost of a poll does not depend on how often it is polled. Snapshots must not be
+        modified by readers.
+
+        Args:
+            build: Callable returning a JSON-serializable snapshot of the current state
+        """
+        self._build = build
+        self._lock = threading.Lock()
+        self._entry = (object(), None, None)  # (version, snapshot, JSON bytes), replaced as a whole
+        self.stats = {
+            "builds": 0,
+            "hits": 0
+        }
+
+    def get(self, version):
+        """Get the snapshot for a state version
+
+        Args:
+            version: Current version of the state (any value comparable with ==)
+
+        Returns:
+            The cached snapshot, rebuilt if the version changed
+        """
+        return self._get_entry(version)[1]
+
+    def get_json(self, version):
+        """Get the snapshot for a state version serialized as JSON
+
+        Args:
+            version: Current version of the state
+
+        Returns:
+            bytes: UTF-8 JSON of the cached snapshot
+        """
+        return self._get_entry(version)[2]
+
+    def _get_entry(self, version):
+        """Return the cached entry, rebuilding it if it is for another version"""
+        entry = self._entry
+        if entry[0] == version:
+            self.stats["hits"] += 1
+            return entry
+
+        with self._lock:
+            # Another reader may have rebuilt it while we waited
+            entry = self._entry
+            if entry[0] == version:
+                self.stats["hits"] += 1
+                return entry
+
+            snapshot = self._build()
+            entry = (version, snapshot, json.dumps(snapshot, default=str).encode("utf-8"))
+            self._entry = entry
+            self.stats["builds"] += 1
+            return entry